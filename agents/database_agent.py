@@ -4,7 +4,7 @@ Handles knowledge graph updates and retrieval operations.
 """
 
 from .base_agent import BaseAgent, create_handoff_function
-from tools import kg_updater, kg_retriever
+from tools import kg_updater, kg_retriever, kg_job_status
 from tools.database_tools import (
     hs_neo4j_upsert_documents,
     hs_neo4j_retrieve,
@@ -50,6 +50,7 @@ class DatabaseAgent(BaseAgent):
             "   - Return contextual information for answering questions\n"
             "3. Best Practices:\n"
             "   - Always use kg_updater when storing new information\n"
+            "   - For large texts, kg_updater(async_mode=True) queues the ingest; check it with kg_job_status\n"
             "   - Always use kg_retriever when querying the knowledge base\n"
             "   - Ensure data quality and consistency\n"
             "   - Handle errors gracefully\n"
@@ -61,6 +62,7 @@ class DatabaseAgent(BaseAgent):
         # Add database tools
         self.add_tool(kg_updater)
         self.add_tool(kg_retriever)
+        self.add_tool(kg_job_status)
         # Haystack + Neo4j tools
         self.add_tool(hs_neo4j_upsert_documents)
         self.add_tool(hs_neo4j_retrieve)
@@ -4,8 +4,8 @@ Manages the entire coding workflow and coordinates between other agents.
 """
 
 from .base_agent import BaseAgent, create_handoff_function
-from tools import read_file, list_directory, finalize_function
-from tools.task_tools import create_task_list, update_task_status
+from tools import read_file, list_directory, finalize_function, finalize_functions
+from tools.task_tools import create_task_list, update_task_status, update_task_statuses
 
 
 class OrchestratorAgent(BaseAgent):
@@ -63,7 +63,7 @@ class OrchestratorAgent(BaseAgent):
             "        • Testing tasks → transfer_to_tester_agent\n"
             "     c. Wait for the agent to complete and return results\n"
             "     d. Mark task as 'completed' using update_task_status(task_index, 'completed')\n"
-            "     e. Move to the next task and repeat\n"
+            "     e. Move to the next task and repeat (update_task_statuses can complete one task and start the next in one call)\n"
             "   - DO NOT stop after creating the task list. You must complete ALL tasks.\n"
             "   - DO NOT just describe what needs to be done. Actually execute each task.\n"
             "   - Track progress continuously and provide status updates.\n"
@@ -72,7 +72,7 @@ class OrchestratorAgent(BaseAgent):
             "   - CRITICAL WORKFLOW - YOU MUST FOLLOW THIS SEQUENCE:\n"
             "     a. Code Implementation → transfer_to_coder_agent (ONLY for writing production code)\n"
             "     b. Testing → transfer_to_tester_agent (ONLY Tester writes and runs tests)\n"
-            "     c. Test Results → If PASS: use finalize_function; If FAIL: back to Coder with errors\n"
+            "     c. Test Results → If PASS: use finalize_function (finalize_functions with a JSON array for several at once); If FAIL: back to Coder with errors\n"
             "   - NEVER write tests yourself or ask Coder to write tests\n"
             "   - NEVER skip the Tester Agent - all code MUST be tested by Tester\n"
             "   - The Tester Agent will:\n"
@@ -107,8 +107,10 @@ class OrchestratorAgent(BaseAgent):
         self.add_tool(read_file)
         self.add_tool(list_directory)
         self.add_tool(finalize_function)
+        self.add_tool(finalize_functions)
         self.add_tool(create_task_list)
         self.add_tool(update_task_status)
+        self.add_tool(update_task_statuses)
         
         # Add handoff functions
         for handoff_func in self.get_handoff_functions():
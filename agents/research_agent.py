@@ -40,17 +40,19 @@ class ResearchAgent(BaseAgent):
             "Best practices:\n"
             "- Use specific search queries for better results\n"
             "- Search multiple times with different keywords if needed\n"
+            "- Use web_search_batch with a JSON array of queries to run several independent searches at once\n"
             "- Always cite your sources\n"
             "- Be clear about the recency of information\n"
             "- Transfer back to Orchestrator when research is complete\n\n"
-            "You have access to web_search tool for searching the internet."
+            "You have access to web_search and web_search_batch tools for searching the internet."
         ))
         super().__init__(**kwargs)
         
         # Add web search tool
         try:
-            from tools.research_tools import web_search
+            from tools.research_tools import web_search, web_search_batch
             self.add_tool(web_search)
+            self.add_tool(web_search_batch)
         except ImportError:
             print("Warning: Web search tool not available. Install serper-dev-haystack or configure web search.")
         
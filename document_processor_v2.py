@@ -3,12 +3,13 @@ Advanced document processing module using vllm and docling_core for multi-page d
 Supports various file formats with proper document structure handling and batch processing.
 """
 
+import io
 import os
 import tempfile
 import asyncio
 import time
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union
 from pathlib import Path
 import shutil
 
@@ -29,6 +30,87 @@ except ImportError as e:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# A document source is a path on disk, the raw uploaded bytes, or an already
+# decoded PIL image (e.g. a rendered PDF page) that skips any encode/decode.
+DocumentSource = Union[str, bytes, "Image.Image"]
+
+
+def _as_file(source: DocumentSource):
+    """Return something Image.open / open-style readers accept for a document source."""
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _load_rgb_image(source: DocumentSource) -> "Image.Image":
+    """Load an image source as RGB, using in-memory PIL images as-is."""
+    if isinstance(source, Image.Image):
+        return source if source.mode == "RGB" else source.convert("RGB")
+    with Image.open(_as_file(source)) as im:
+        return im.convert("RGB")
+
+
+# Extracted PDF text below these is treated as a failed extraction (scanned pages,
+# broken font maps) and the next extractor is tried
+PDF_TEXT_MIN_CHARS = 100
+PDF_TEXT_MIN_ALPHA = 0.4
+
+
+def _text_quality(text: str) -> float:
+    """Share of alphabetic characters in the first 2000 chars (0.0 for near-empty text)."""
+    sample = text[:2000]
+    if len(text.strip()) < PDF_TEXT_MIN_CHARS:
+        return 0.0
+    return sum(c.isalpha() for c in sample) / max(1, len(sample))
+
+
+def _extract_pymupdf(source: DocumentSource) -> str:
+    import fitz  # PyMuPDF
+    if isinstance(source, bytes):
+        doc = fitz.open(stream=source, filetype="pdf")
+    else:
+        doc = fitz.open(source)
+    try:
+        return "".join(page.get_text("text", sort=False) for page in doc)
+    finally:
+        doc.close()
+
+
+def _extract_pdfplumber(source: DocumentSource) -> str:
+    import pdfplumber
+    with pdfplumber.open(_as_file(source)) as pdf:
+        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+
+
+def _extract_pypdf2(source: DocumentSource) -> str:
+    from PyPDF2 import PdfReader
+    reader = PdfReader(_as_file(source))
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def extract_pdf_text(source: DocumentSource) -> str:
+    """
+    Extract PDF text with the fastest extractor that gives usable output.
+    
+    PyMuPDF runs first; pdfplumber and then PyPDF2 are only tried (when
+    installed) if the result falls below the quality threshold. Returns the
+    best text seen.
+    """
+    best_text, best_quality = "", -1.0
+    for extractor in (_extract_pymupdf, _extract_pdfplumber, _extract_pypdf2):
+        try:
+            text = extractor(source)
+        except ImportError:
+            continue
+        except Exception as e:
+            logger.warning(f"{extractor.__name__} failed: {e}")
+            continue
+        quality = _text_quality(text)
+        if quality > best_quality:
+            best_text, best_quality = text, quality
+        if quality >= PDF_TEXT_MIN_ALPHA:
+            break
+    return best_text
+
+
 class AdvancedDocumentProcessor:
     """
     Advanced document processor using vllm and docling_core for converting documents to markdown.
@@ -104,12 +186,12 @@ class AdvancedDocumentProcessor:
         ext = Path(filename).suffix.lower()
         return ext in self.supported_extensions
     
-    async def process_document(self, file_path: str, filename: str) -> str:
+    async def process_document(self, file_path: DocumentSource, filename: str) -> str:
         """
         Process a single document and convert to markdown.
         
         Args:
-            file_path: Path to the uploaded file
+            file_path: Path to the uploaded file, or its raw bytes
             filename: Original filename
             
         Returns:
@@ -136,12 +218,11 @@ class AdvancedDocumentProcessor:
             logger.error(f"Error processing document {filename}: {e}")
             return f"Error processing document {filename}: {str(e)}"
     
-    async def _process_single_image(self, image_path: str, filename: str) -> str:
+    async def _process_single_image(self, image_path: DocumentSource, filename: str) -> str:
         """Process a single image file using vllm and docling."""
         try:
             # Load and prepare image
-            with Image.open(image_path) as im:
-                image = im.convert("RGB")
+            image = _load_rgb_image(image_path)
             
             # Prepare prompt
             prompt = self.processor.apply_chat_template(self.messages, add_generation_prompt=True)
@@ -179,7 +260,7 @@ class AdvancedDocumentProcessor:
             logger.error(f"Error processing image {filename}: {e}")
             return f"Error processing image {filename}: {str(e)}"
     
-    async def _process_multi_page_document(self, file_path: str, filename: str) -> str:
+    async def _process_multi_page_document(self, file_path: DocumentSource, filename: str) -> str:
         """Process multi-page documents (PDF, DOCX, etc.)."""
         try:
             ext = Path(filename).suffix.lower()
@@ -194,7 +275,7 @@ class AdvancedDocumentProcessor:
             logger.error(f"Error processing multi-page document {filename}: {e}")
             return f"Error processing multi-page document {filename}: {str(e)}"
     
-    async def _process_pdf_document(self, file_path: str, filename: str) -> str:
+    async def _process_pdf_document(self, file_path: DocumentSource, filename: str) -> str:
         """Process PDF documents by converting to images and processing with vllm."""
         try:
             # Import PDF processing libraries
@@ -208,18 +289,21 @@ class AdvancedDocumentProcessor:
             if not PDF_AVAILABLE:
                 return f"# Document: {filename}\n\n*PDF processing requires pymupdf and pdf2image libraries. Install with: pip install pymupdf pdf2image*"
             
-            # Extract text first as fallback
-            doc = fitz.open(file_path)
-            text_content = ""
-            for page_num in range(doc.page_count):
-                page = doc.load_page(page_num)
-                text_content += page.get_text()
-            doc.close()
+            max_pages = 3
+            
+            def extract_text() -> str:
+                return extract_pdf_text(file_path)
+            
+            def render_pages() -> list:
+                # pdf2image clamps last_page to the page count; poppler renders pages in parallel
+                thread_count = min(max_pages, os.cpu_count() or 1)
+                if isinstance(file_path, bytes):
+                    return pdf2image.convert_from_bytes(file_path, first_page=1, last_page=max_pages, thread_count=thread_count)
+                return pdf2image.convert_from_path(file_path, first_page=1, last_page=max_pages, thread_count=thread_count)
             
             # Try to convert to images for better processing
             try:
-                # Convert first few pages to images
-                images = pdf2image.convert_from_path(file_path, first_page=1, last_page=min(3, doc.page_count))
+                images = await asyncio.to_thread(render_pages)
                 
                 if images:
                     # Process images with vllm
@@ -238,33 +322,36 @@ class AdvancedDocumentProcessor:
                     outputs = self.llm.generate(batched_inputs, sampling_params=sampling_params)
                     
                     # Combine results
-                    combined_markdown = f"# Document: {filename}\n\n"
+                    parts = [f"# Document: {filename}\n\n"]
                     for i, output in enumerate(outputs):
                         doctags = output.outputs[0].text
                         doctags_doc = DocTagsDocument.from_doctags_and_image_pairs([doctags], [images[i]])
                         doc = DoclingDocument.load_from_doctags(doctags_doc, document_name=f"{filename}_page_{i+1}")
                         page_markdown = doc.export_to_markdown()
-                        combined_markdown += f"## Page {i+1}\n\n{page_markdown}\n\n"
+                        parts.append(f"## Page {i+1}\n\n{page_markdown}\n\n")
                     
-                    return combined_markdown
-                else:
-                    # Fallback to text processing
-                    return f"# Document: {filename}\n\n{text_content}"
+                    return "".join(parts)
                     
             except Exception as e:
                 logger.warning(f"PDF to image conversion failed: {e}, falling back to text extraction")
-                return f"# Document: {filename}\n\n{text_content}"
+            
+            # Fallback to text processing; the text is only extracted when the image path fails
+            text_content = await asyncio.to_thread(extract_text)
+            return f"# Document: {filename}\n\n{text_content}"
                 
         except Exception as e:
             logger.error(f"Error processing PDF {filename}: {e}")
             return f"Error processing PDF {filename}: {str(e)}"
     
-    async def _process_text_file(self, file_path: str, filename: str) -> str:
+    async def _process_text_file(self, file_path: DocumentSource, filename: str) -> str:
         """Process text-based files."""
         try:
             # Read text content
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                text_content = f.read()
+            if isinstance(file_path, bytes):
+                text_content = file_path.decode('utf-8', errors='ignore')
+            else:
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    text_content = f.read()
             
             # For text files, we can return them directly or with minimal processing
             return f"# Document: {filename}\n\n{text_content}"
@@ -273,13 +360,13 @@ class AdvancedDocumentProcessor:
             logger.error(f"Error processing text file {filename}: {e}")
             return f"Error processing text file {filename}: {str(e)}"
     
-    async def process_multiple_documents(self, file_paths: List[str], filenames: List[str]) -> List[str]:
+    async def process_multiple_documents(self, file_paths: List[DocumentSource], filenames: List[str]) -> List[str]:
         """
         Process multiple documents and return markdown for each.
         Uses batch processing for efficiency when possible.
         
         Args:
-            file_paths: List of file paths
+            file_paths: List of file paths or raw file contents
             filenames: List of original filenames
             
         Returns:
@@ -305,19 +392,21 @@ class AdvancedDocumentProcessor:
             else:
                 other_files.append((file_path, filename))
         
-        # Process images in batch for efficiency
+        # Process images in one batch and the other files individually,
+        # all scheduled together so their I/O and thread work overlap
+        jobs = [self.process_document(file_path, filename) for file_path, filename in other_files]
         if image_files:
-            batch_results = await self._process_image_batch(image_files)
-            results.extend(batch_results)
+            jobs.insert(0, self._process_image_batch(image_files))
+        outputs = await asyncio.gather(*jobs)
         
-        # Process other files individually
-        for file_path, filename in other_files:
-            markdown_content = await self.process_document(file_path, filename)
-            results.append(markdown_content)
+        if image_files:
+            results.extend(outputs[0])
+            outputs = outputs[1:]
+        results.extend(outputs)
         
         return results
     
-    async def _process_image_batch(self, image_files: List[Tuple[str, str]]) -> List[str]:
+    async def _process_image_batch(self, image_files: List[Tuple[DocumentSource, str]]) -> List[str]:
         """Process multiple images in a single batch for efficiency."""
         try:
             # Prepare batch inputs
@@ -326,8 +415,7 @@ class AdvancedDocumentProcessor:
             images = []
             
             for file_path, filename in image_files:
-                with Image.open(file_path) as im:
-                    image = im.convert("RGB")
+                image = _load_rgb_image(file_path)
                 
                 prompt = self.processor.apply_chat_template(self.messages, add_generation_prompt=True)
                 batched_inputs.append({"prompt": prompt, "multi_modal_data": {"image": image}})
@@ -383,12 +471,13 @@ class AdvancedDocumentProcessor:
 # Global document processor instance
 document_processor_v2 = AdvancedDocumentProcessor()
 
-async def process_uploaded_documents_v2(file_paths: List[str], filenames: List[str]) -> List[str]:
+async def process_uploaded_documents_v2(file_paths: List[DocumentSource], filenames: List[str]) -> List[str]:
     """
     Process uploaded documents using the advanced vllm-based processor.
     
     Args:
-        file_paths: List of temporary file paths
+        file_paths: List of temporary file paths, uploaded bytes held in memory,
+            or PIL images for image documents
         filenames: List of original filenames
         
     Returns:
@@ -410,9 +499,9 @@ def combine_prompt_with_documents_v2(user_prompt: str, document_markdowns: List[
     if not document_markdowns:
         return user_prompt
     
-    combined_prompt = user_prompt
+    parts = [user_prompt]
     
     for i, doc_markdown in enumerate(document_markdowns, 1):
-        combined_prompt += f"\n\n---\n\n**Attached Document {i}:**\n\n{doc_markdown}"
+        parts.append(f"\n\n---\n\n**Attached Document {i}:**\n\n{doc_markdown}")
     
-    return combined_prompt
+    return "".join(parts)
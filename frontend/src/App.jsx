@@ -22,6 +22,7 @@ function App() {
   const [submittedPrompt, setSubmittedPrompt] = useState('')
   const [submittedDocuments, setSubmittedDocuments] = useState([])
   const [topBarActive, setTopBarActive] = useState(false)
+  const [streamConnected, setStreamConnected] = useState(false)
 
   // Fetch agents on component mount and ensure they're always visible
   useEffect(() => {
@@ -32,6 +33,23 @@ function App() {
     fetchSystemStatus()
   }, [])
 
+  // Receive messages as they are produced instead of polling for them
+  useEffect(() => {
+    const source = new EventSource(`${API_BASE}/messages/stream?limit=100`)
+    source.addEventListener('snapshot', (event) => {
+      setStreamConnected(true)
+      setMessages(JSON.parse(event.data))
+    })
+    source.onmessage = (event) => {
+      const message = JSON.parse(event.data)
+      setMessages((prev) => [...prev, message].slice(-100))
+    }
+    // EventSource reconnects on its own; fall back to polling until it does
+    source.onerror = () => setStreamConnected(false)
+
+    return () => source.close()
+  }, [])
+
   // Poll periodically for updates (reduce frequency to lower backend load)
   useEffect(() => {
     const interval = setInterval(async () => {
@@ -39,7 +57,7 @@ function App() {
         setIsUpdating(true)
         try {
           await Promise.all([
-            fetchMessages(),
+            ...(streamConnected ? [] : [fetchMessages()]),
             fetchTasks(),
             fetchGeneratedFiles()
           ])
@@ -50,7 +68,7 @@ function App() {
     }, 1500)
 
     return () => clearInterval(interval)
-  }, [pausePolling])
+  }, [pausePolling, streamConnected])
 
   // Activate top bar visuals with a slight delay after submit
   useEffect(() => {
@@ -218,16 +236,25 @@ function App() {
     setIsLoading(true)
     setWorkflowStatus('planning')
     try {
-      const response = await fetch(`${API_BASE}/submit-prompt`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ 
-          prompt,
-          documents: documents.length > 0 ? documents : undefined
+      let response
+      if (documents.length > 0) {
+        // Upload, process and start the workflow in one request
+        const formData = new FormData()
+        formData.append('prompt', prompt)
+        documents.forEach((file) => formData.append('files', file))
+        response = await fetch(`${API_BASE}/submit-prompt-with-docs`, {
+          method: 'POST',
+          body: formData
         })
-      })
+      } else {
+        response = await fetch(`${API_BASE}/submit-prompt`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({ prompt })
+        })
+      }
       const data = await response.json()
       console.log('Prompt submission result:', data)
       if (data.status !== 'success') {
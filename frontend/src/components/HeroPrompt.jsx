@@ -2,46 +2,26 @@ import React, { useState, useRef } from 'react'
 
 const HeroPrompt = ({ onSubmitPrompt, isLoading, isSubmitted = false, submittedPrompt = '', submittedDocuments = [] }) => {
   const [prompt, setPrompt] = useState('')
-  const [uploadedDocuments, setUploadedDocuments] = useState([])
-  const [isUploading, setIsUploading] = useState(false)
+  // Selected files are sent along with the prompt, in one request
+  const [attachedFiles, setAttachedFiles] = useState([])
   const fileInputRef = useRef(null)
 
   const handleSubmit = async (e) => {
     e?.preventDefault?.()
-    if (!prompt.trim() || isLoading || isUploading) return
-    await onSubmitPrompt(prompt.trim(), uploadedDocuments)
-    setUploadedDocuments([])
+    if (!prompt.trim() || isLoading) return
+    await onSubmitPrompt(prompt.trim(), attachedFiles)
+    setAttachedFiles([])
     setPrompt('')
   }
 
-  const handleFileUpload = async (e) => {
+  const handleFileSelect = (e) => {
     const files = Array.from(e.target.files || [])
-    if (files.length === 0) return
-
-    setIsUploading(true)
-    try {
-      const formData = new FormData()
-      files.forEach((file) => formData.append('files', file))
-      const response = await fetch('http://localhost:8000/upload-documents', {
-        method: 'POST',
-        body: formData
-      })
-      const result = await response.json()
-      if (result.status === 'success') {
-        setUploadedDocuments((prev) => [...prev, ...result.documents])
-      } else {
-        alert(`Error uploading documents: ${result.message}`)
-      }
-    } catch (error) {
-      alert(`Error uploading documents: ${error.message}`)
-    } finally {
-      setIsUploading(false)
-      if (fileInputRef.current) fileInputRef.current.value = ''
-    }
+    if (files.length > 0) setAttachedFiles((prev) => [...prev, ...files])
+    if (fileInputRef.current) fileInputRef.current.value = ''
   }
 
   const removeDocument = (index) => {
-    setUploadedDocuments((prev) => prev.filter((_, i) => i !== index))
+    setAttachedFiles((prev) => prev.filter((_, i) => i !== index))
   }
 
   const getDocName = (doc, index) => {
@@ -49,7 +29,7 @@ const HeroPrompt = ({ onSubmitPrompt, isLoading, isSubmitted = false, submittedP
   }
 
   const handleKeyDown = (e) => {
-    if (e.key === 'Enter' && (isLoading || isUploading)) {
+    if (e.key === 'Enter' && isLoading) {
       e.preventDefault()
     }
   }
@@ -72,21 +52,21 @@ const HeroPrompt = ({ onSubmitPrompt, isLoading, isSubmitted = false, submittedP
             multiple
             accept=".pdf,.docx,.doc,.txt,.md,.rtf,.png,.jpg,.jpeg,.gif,.bmp,.tiff,.html,.htm,.xml"
             className="hidden"
-            onChange={handleFileUpload}
-            disabled={isLoading || isUploading}
+            onChange={handleFileSelect}
+            disabled={isLoading}
           />
           <button
             type="button"
             onClick={() => fileInputRef.current?.click()}
-            disabled={isLoading || isUploading}
+            disabled={isLoading}
             className={`flex items-center justify-center aspect-square rounded-full mr-3 transition-all h-14 ${
-              isLoading || isUploading
+              isLoading
                 ? 'bg-gray-200 text-gray-400 cursor-not-allowed'
                 : 'bg-gray-900 text-white hover:opacity-90'
             }`}
             title="Attach documents"
           >
-            {isUploading ? '…' : '📎'}
+            📎
           </button>
 
           {/* Prompt input */}
@@ -96,22 +76,22 @@ const HeroPrompt = ({ onSubmitPrompt, isLoading, isSubmitted = false, submittedP
             onChange={(e) => setPrompt(e.target.value)}
             onKeyDown={handleKeyDown}
             placeholder="Ask for a feature, tool, or change..."
-            disabled={isLoading || isUploading}
+            disabled={isLoading}
             className="flex-1 h-14 px-5 rounded-full border border-gray-300 focus:ring-2 focus:ring-gray-900 focus:border-transparent text-gray-900 placeholder-gray-400"
           />
 
           {/* Send Button (right circle) */}
           <button
             type="submit"
-            disabled={!prompt.trim() || isLoading || isUploading}
+            disabled={!prompt.trim() || isLoading}
             className={`flex items-center justify-center aspect-square rounded-full ml-3 h-14 w-14 transition-all ${
-              !prompt.trim() || isLoading || isUploading
+              !prompt.trim() || isLoading
                 ? 'bg-gray-200 text-gray-400 cursor-not-allowed'
                 : 'bg-gray-900 text-white hover:opacity-90'
             }`}
-            title={isUploading ? "Please wait for file processing to complete" : "Send"}
+            title="Send"
           >
-            {isLoading || isUploading ? '…' : (
+            {isLoading ? '…' : (
               <svg
                 className="flex-shrink-0"
                 width="20"
@@ -134,11 +114,11 @@ const HeroPrompt = ({ onSubmitPrompt, isLoading, isSubmitted = false, submittedP
         </div>
 
         {/* Attached documents preview */}
-        {uploadedDocuments.length > 0 && (
+        {attachedFiles.length > 0 && (
           <div className="mt-3 flex flex-wrap gap-2">
-            {uploadedDocuments.map((doc, index) => (
+            {attachedFiles.map((doc, index) => (
               <div key={index} className="flex items-center gap-2 px-3 py-1 rounded-full border border-gray-300 bg-white shadow-sm">
-                <span className="text-sm">📄 Doc {index + 1}</span>
+                <span className="text-sm">📄 {getDocName(doc, index)}</span>
                 <button
                   type="button"
                   onClick={() => removeDocument(index)}
@@ -2,8 +2,8 @@ import React, { useState, useRef } from 'react'
 
 const UserPromptInput = ({ onSubmitPrompt, isLoading }) => {
   const [prompt, setPrompt] = useState('')
-  const [uploadedDocuments, setUploadedDocuments] = useState([])
-  const [isUploading, setIsUploading] = useState(false)
+  // Selected files are sent along with the prompt, in one request
+  const [attachedFiles, setAttachedFiles] = useState([])
   const fileInputRef = useRef(null)
   const [examples] = useState([
     "Create a basic calculator with 4 main operations + - / x"
@@ -11,49 +11,26 @@ const UserPromptInput = ({ onSubmitPrompt, isLoading }) => {
 
   const handleSubmit = async (e) => {
     e.preventDefault()
-    if (prompt.trim() && !isUploading) {
-      await onSubmitPrompt(prompt.trim(), uploadedDocuments)
+    if (prompt.trim()) {
+      await onSubmitPrompt(prompt.trim(), attachedFiles)
       setPrompt('')
-      setUploadedDocuments([])
+      setAttachedFiles([])
     }
   }
 
-  const handleFileUpload = async (e) => {
+  const handleFileSelect = (e) => {
     const files = Array.from(e.target.files)
-    if (files.length === 0) return
-
-    setIsUploading(true)
-    try {
-      const formData = new FormData()
-      files.forEach(file => {
-        formData.append('files', file)
-      })
-
-      const response = await fetch('http://localhost:8000/upload-documents', {
-        method: 'POST',
-        body: formData
-      })
-
-      const result = await response.json()
-      
-      if (result.status === 'success') {
-        setUploadedDocuments(prev => [...prev, ...result.documents])
-      } else {
-        alert(`Error uploading documents: ${result.message}`)
-      }
-    } catch (error) {
-      alert(`Error uploading documents: ${error.message}`)
-    } finally {
-      setIsUploading(false)
-      // Reset file input
-      if (fileInputRef.current) {
-        fileInputRef.current.value = ''
-      }
+    if (files.length > 0) {
+      setAttachedFiles(prev => [...prev, ...files])
+    }
+    // Reset file input
+    if (fileInputRef.current) {
+      fileInputRef.current.value = ''
     }
   }
 
   const removeDocument = (index) => {
-    setUploadedDocuments(prev => prev.filter((_, i) => i !== index))
+    setAttachedFiles(prev => prev.filter((_, i) => i !== index))
   }
 
   const handleExampleClick = (example) => {
@@ -61,7 +38,7 @@ const UserPromptInput = ({ onSubmitPrompt, isLoading }) => {
   }
 
   const handleKeyDown = (e) => {
-    if (e.key === 'Enter' && (isLoading || isUploading)) {
+    if (e.key === 'Enter' && isLoading) {
       e.preventDefault()
     }
   }
@@ -85,7 +62,7 @@ const UserPromptInput = ({ onSubmitPrompt, isLoading }) => {
             placeholder="e.g., Create a calculator with basic math operations, error handling, and unit tests..."
             className="w-full px-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-transparent resize-none"
             rows={4}
-            disabled={isLoading || isUploading}
+            disabled={isLoading}
           />
         </div>
 
@@ -100,45 +77,38 @@ const UserPromptInput = ({ onSubmitPrompt, isLoading }) => {
               type="file"
               multiple
               accept=".pdf,.docx,.doc,.txt,.md,.rtf,.png,.jpg,.jpeg,.gif,.bmp,.tiff,.html,.htm,.xml"
-              onChange={handleFileUpload}
+              onChange={handleFileSelect}
               className="hidden"
-              disabled={isLoading || isUploading}
+              disabled={isLoading}
             />
             <button
               type="button"
               onClick={() => fileInputRef.current?.click()}
-              disabled={isLoading || isUploading}
+              disabled={isLoading}
               className={`w-full py-2 px-4 rounded-lg border-2 border-dashed transition-all ${
-                isLoading || isUploading
+                isLoading
                   ? 'border-gray-300 text-gray-400 cursor-not-allowed'
                   : 'border-blue-300 text-blue-600 hover:border-blue-400 hover:bg-blue-50'
               }`}
             >
-              {isUploading ? (
-                <div className="flex items-center justify-center space-x-2">
-                  <div className="animate-spin rounded-full h-4 w-4 border-2 border-blue-600 border-t-transparent"></div>
-                  <span>Processing documents...</span>
-                </div>
-              ) : (
-                '📎 Choose Documents to Upload'
-              )}
+              📎 Choose Documents to Attach
             </button>
             
-            {/* Display uploaded documents */}
-            {uploadedDocuments.length > 0 && (
+            {/* Display attached documents */}
+            {attachedFiles.length > 0 && (
               <div className="space-y-2">
-                <div className="text-sm font-medium text-gray-700">Uploaded Documents:</div>
-                {uploadedDocuments.map((doc, index) => (
+                <div className="text-sm font-medium text-gray-700">Attached Documents:</div>
+                {attachedFiles.map((file, index) => (
                   <div key={index} className="flex items-center justify-between p-2 bg-green-50 border border-green-200 rounded-lg">
                     <div className="flex items-center space-x-2">
                       <span className="text-green-600">📄</span>
-                      <span className="text-sm text-green-800">Document {index + 1}</span>
+                      <span className="text-sm text-green-800">{file.name}</span>
                     </div>
                     <button
                       type="button"
                       onClick={() => removeDocument(index)}
                       className="text-red-500 hover:text-red-700 text-sm"
-                      disabled={isLoading || isUploading}
+                      disabled={isLoading}
                     >
                       ✕
                     </button>
@@ -151,18 +121,17 @@ const UserPromptInput = ({ onSubmitPrompt, isLoading }) => {
 
         <button
           type="submit"
-          disabled={!prompt.trim() || isLoading || isUploading}
+          disabled={!prompt.trim() || isLoading}
           className={`w-full py-3 px-4 rounded-lg font-semibold transition-all duration-200 ${
-            !prompt.trim() || isLoading || isUploading
+            !prompt.trim() || isLoading
               ? 'bg-gray-300 text-gray-500 cursor-not-allowed'
               : 'bg-blue-500 hover:bg-blue-600 text-white shadow-md hover:shadow-lg'
           }`}
-          title={isUploading ? "Please wait for file processing to complete" : ""}
         >
-          {isLoading || isUploading ? (
+          {isLoading ? (
             <div className="flex items-center justify-center space-x-2">
               <div className="animate-spin rounded-full h-4 w-4 border-2 border-white border-t-transparent"></div>
-              <span>{isUploading ? 'Processing files...' : 'Processing...'}</span>
+              <span>{attachedFiles.length > 0 ? 'Processing documents...' : 'Processing...'}</span>
             </div>
           ) : (
             '🚀 Start Agent Workflow'
@@ -179,7 +148,7 @@ const UserPromptInput = ({ onSubmitPrompt, isLoading }) => {
               key={index}
               onClick={() => handleExampleClick(example)}
               className="w-full text-left p-3 text-sm bg-gray-50 hover:bg-gray-100 rounded-lg border border-gray-200 transition-colors"
-              disabled={isLoading || isUploading}
+              disabled={isLoading}
             >
               {example}
             </button>
@@ -3,20 +3,22 @@ Real integration bridge between the frontend and the actual agent system.
 This connects to your actual Orchestrator, Coder, and Tester agents.
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Form, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import json
 import time
 import asyncio
 import threading
 from datetime import datetime
 import uuid
+import logging
 import os
-import tempfile
 import shutil
 from pathlib import Path
+import aiofiles
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -27,6 +29,8 @@ from agents import create_coding_agents
 from programmatic_agent_runner import run_agent_workflow_programmatic, extract_agent_communications, extract_tasks_from_messages
 from document_processor_v2 import process_uploaded_documents_v2, combine_prompt_with_documents_v2
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Real Agent Communication Bridge")
 
 # Enable CORS for frontend
@@ -49,6 +53,26 @@ current_conversation = []
 workflow_thread = None
 workflow_running = False
 
+# Version counters bumped on every mutation, used to build cheap ETags
+_versions = {"messages": 0, "tasks": 0}
+# Prefixed to every ETag: the counters restart at 0 with the process, so an
+# ETag from before a restart must not match one issued after it
+_BOOT_ID = uuid.uuid4().hex[:12]
+
+# /messages/stream subscribers as (event loop, queue) pairs, fed from the workflow thread
+_sse_subscribers: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+_sse_lock = threading.Lock()
+
+# Sort orders accepted by /files, as (key function, reverse) pairs
+FILE_SORTS = {
+    "mtime_desc": (lambda entry: entry[2].st_mtime_ns, True),
+    "mtime_asc": (lambda entry: entry[2].st_mtime_ns, False),
+    "name": (lambda entry: entry[0], False),
+}
+
+# Last parsed _active_tasks.json, keyed by its mtime so unchanged files are not re-read
+_tasks_cache = {"mtime": 0, "value": []}
+
 class PromptRequest(BaseModel):
     prompt: str
     documents: Optional[List[str]] = None  # List of document filenames
@@ -72,6 +96,43 @@ def initialize_agents():
             print("   Make sure OPENAI_API_KEY environment variable is set")
         return False
 
+def bump_version(*keys: str):
+    """Mark the given stores as changed so pollers get a fresh ETag."""
+    for key in keys:
+        _versions[key] += 1
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Return a 304 response if the client already has this ETag, else tag the response.
+    
+    etag is a weak ETag (W/"..."); the process boot id is added to it here.
+    """
+    etag = f'W/"{_BOOT_ID}-{etag[3:]}'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return None
+
+def _offer(queue: asyncio.Queue, item):
+    """Queue an event for a subscriber, dropping it if the client is not keeping up."""
+    try:
+        queue.put_nowait(item)
+    except asyncio.QueueFull:
+        pass
+
+def publish_event(event: str, data):
+    """Push an event to every /messages/stream subscriber. Safe to call from any thread."""
+    for loop, queue in list(_sse_subscribers):
+        loop.call_soon_threadsafe(_offer, queue, (event, data))
+
+def stream_messages(msgs: List[Dict]):
+    """Append messages to the store and push them to stream subscribers."""
+    with _sse_lock:
+        messages_store.extend(msgs)
+        bump_version("messages")
+        for msg in msgs:
+            publish_event("message", msg)
+
 # Message conversion functions are now in programmatic_agent_runner.py
 
 def run_agent_workflow(prompt: str):
@@ -88,6 +149,8 @@ def run_agent_workflow(prompt: str):
         current_conversation = []
         messages_store = []
         tasks_store = []
+        bump_version("messages", "tasks")
+        publish_event("snapshot", [])
         
         print(f"🚀 Starting agent workflow with prompt: {prompt}")
         
@@ -99,7 +162,7 @@ def run_agent_workflow(prompt: str):
         # Initialize conversation with the user's prompt and stream immediately
         messages = [{"role": "user", "content": prompt}]
         current_conversation.extend(messages)
-        messages_store.extend(extract_agent_communications(messages))
+        stream_messages(extract_agent_communications(messages))
         
         # Begin workflow
         workflow_status = "coding"
@@ -123,8 +186,7 @@ def run_agent_workflow(prompt: str):
             
             # Stream new messages to frontend immediately
             for msg in new_messages:
-                msgs = extract_agent_communications([msg])
-                messages_store.extend(msgs)
+                stream_messages(extract_agent_communications([msg]))
                 
                 # Check for task list created by the Orchestrator using create_task_list tool
                 tasks_file = Path(".agent_workspace") / "_active_tasks.json"
@@ -135,6 +197,7 @@ def run_agent_workflow(prompt: str):
                             if loaded_tasks:
                                 tasks_store = loaded_tasks
                                 tasks_extracted = True
+                                bump_version("tasks")
                                 print(f"📋 Loaded {len(tasks_store)} tasks from task list")
                     except Exception as e:
                         print(f"Warning: Could not load tasks from file: {e}")
@@ -147,10 +210,6 @@ def run_agent_workflow(prompt: str):
                 no_handoff_count = 0
             current_agent_name = next_agent_name
             
-            # Small sleep to avoid tight loop (and allow UI to poll)
-            import time
-            time.sleep(0.05)
-            
             # Stop if no handoff occurs repeatedly (prevents getting stuck after tool results)
             if no_handoff_count >= 3:
                 break
@@ -159,9 +218,7 @@ def run_agent_workflow(prompt: str):
         print("✓ Agent workflow completed")
         
     except Exception as e:
-        print(f"❌ Error in agent workflow: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error in agent workflow: {e}")
         workflow_status = "error"
     finally:
         workflow_running = False
@@ -216,7 +273,7 @@ async def get_agents():
                     "name": "Research Agent",
                     "capabilities": ["web_search", "gather_information", "research"],
                     "model": {"provider": "openai", "id": "gpt-4o-mini"},
-                    "tools": ["web_search", "transfer_to_orchestrator_agent"],
+                    "tools": ["web_search", "web_search_batch", "transfer_to_orchestrator_agent"],
                     "description": "Searches the web and gathers current information (API key required for actual use)"
                 },
                 {
@@ -257,26 +314,79 @@ async def get_agents():
     }
 
 @app.get("/messages")
-async def get_messages(limit: int = 50):
+async def get_messages(request: Request, response: Response, limit: int = 50):
     """Get recent messages."""
+    cached = not_modified(request, response, f'W/"{_versions["messages"]}-{limit}"')
+    if cached is not None:
+        return cached
+    
     return {
         "status": "success",
         "messages": messages_store[-limit:] if messages_store else []
     }
 
+@app.get("/messages/stream")
+async def get_messages_stream(limit: int = 100):
+    """Push messages to the client as Server-Sent Events instead of being polled.
+    
+    The first event is a ``snapshot`` of the most recent messages; each new
+    message is then sent as a default ``message`` event as the workflow
+    produces it. A ``snapshot`` with an empty list means the log was cleared.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=256)
+    subscriber = (asyncio.get_running_loop(), queue)
+    with _sse_lock:
+        _sse_subscribers.append(subscriber)
+        snapshot = messages_store[-limit:]
+    
+    async def event_stream():
+        try:
+            yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                prefix = "" if event == "message" else f"event: {event}\n"
+                yield f"{prefix}data: {json.dumps(data)}\n\n"
+        finally:
+            _sse_subscribers.remove(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @app.get("/tasks")
-async def get_tasks():
+async def get_tasks(request: Request, response: Response):
     """Get current tasks."""
     # Check if there's a task file created by the Orchestrator
     tasks_file = Path(".agent_workspace") / "_active_tasks.json"
     current_tasks = tasks_store
     
-    if tasks_file.exists():
-        try:
-            with open(tasks_file, 'r', encoding='utf-8') as f:
-                current_tasks = json.load(f)
-        except Exception as e:
-            print(f"Warning: Could not load tasks from file: {e}")
+    try:
+        tasks_mtime = os.stat(tasks_file).st_mtime_ns
+    except OSError:
+        tasks_mtime = 0
+    etag = f'W/"{_versions["tasks"]}-{tasks_mtime}-{current_task_index}-{workflow_status}"'
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    
+    if tasks_mtime:
+        if tasks_mtime == _tasks_cache["mtime"]:
+            current_tasks = _tasks_cache["value"]
+        else:
+            try:
+                with open(tasks_file, 'r', encoding='utf-8') as f:
+                    current_tasks = json.load(f)
+                _tasks_cache["mtime"] = tasks_mtime
+                _tasks_cache["value"] = current_tasks
+            except Exception as e:
+                print(f"Warning: Could not load tasks from file: {e}")
     
     return {
         "status": "success",
@@ -285,39 +395,96 @@ async def get_tasks():
         "workflowStatus": workflow_status
     }
 
+def scan_workspace(workspace_path: str):
+    """List generated files with their stat info in a single directory scan."""
+    entries = []
+    with os.scandir(workspace_path) as it:
+        for entry in it:
+            if entry.name.endswith(('.py', '.txt')) and entry.is_file():
+                try:
+                    entries.append((entry.name, entry.path, entry.stat()))
+                except OSError:
+                    continue
+    return entries
+
+async def read_workspace_file(name: str, file_path: str, stat: os.stat_result):
+    """Read a preview of a single workspace file without blocking the event loop."""
+    try:
+        # Size comes from stat, so only the preview needs to be read
+        async with aiofiles.open(file_path, 'r') as f:
+            content = await f.read(501)
+        
+        return {
+            "name": name,
+            "path": file_path,
+            "size": stat.st_size,
+            "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            "content": content[:500] + "..." if len(content) > 500 else content
+        }
+    except Exception as e:
+        print(f"Error reading file {name}: {e}")
+        return None
+
+def workspace_etag(entries) -> str:
+    """Build an ETag from the name, mtime and size of each workspace file."""
+    parts = sorted((name, stat.st_mtime_ns, stat.st_size) for name, _, stat in entries)
+    return f'W/"{hash(tuple(parts)) & 0xFFFFFFFFFFFFFFFF:x}"'
+
 @app.get("/files")
-async def get_files():
-    """Get generated files."""
+async def get_files(request: Request, response: Response, offset: int = 0, limit: Optional[int] = None, sort: str = "mtime_desc"):
+    """Get generated files: all of them, or a page when limit is given."""
+    if sort not in FILE_SORTS:
+        return {
+            "status": "error",
+            "message": f"Invalid sort: {sort}. Must be one of {', '.join(FILE_SORTS)}"
+        }
+    
     # Check .agent_workspace for files
     workspace_path = ".agent_workspace"
     files = []
+    total = 0
     
     if os.path.exists(workspace_path):
-        for filename in os.listdir(workspace_path):
-            if filename.endswith(('.py', '.txt')):
-                file_path = os.path.join(workspace_path, filename)
-                try:
-                    with open(file_path, 'r') as f:
-                        content = f.read()
-                    
-                    files.append({
-                        "name": filename,
-                        "path": file_path,
-                        "size": len(content),
-                        "modified": datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat(),
-                        "content": content[:500] + "..." if len(content) > 500 else content
-                    })
-                except Exception as e:
-                    print(f"Error reading file {filename}: {e}")
+        entries = await asyncio.to_thread(scan_workspace, workspace_path)
+        total = len(entries)
+        # Skip reading file contents when nothing changed
+        etag = workspace_etag(entries)
+        cached = not_modified(request, response, f'{etag[:-1]}-{offset}-{limit}-{sort}"')
+        if cached is not None:
+            return cached
+        
+        # Only read the files on the requested page
+        key, reverse = FILE_SORTS[sort]
+        entries.sort(key=key, reverse=reverse)
+        start = max(offset, 0)
+        page = entries[start:] if limit is None else entries[start:start + max(limit, 0)]
+        
+        # Read all files on the page concurrently
+        results = await asyncio.gather(*[
+            read_workspace_file(name, file_path, stat)
+            for name, file_path, stat in page
+        ])
+        files = [f for f in results if f is not None]
     
     return {
         "status": "success",
-        "files": files
+        "files": files,
+        "total": total,
+        "offset": offset,
+        "limit": limit
     }
 
 @app.get("/status")
-async def get_status():
+async def get_status(request: Request, response: Response):
     """Get system status."""
+    etag = (
+        f'W/"{len(agents_dict)}-{_versions["messages"]}-{_versions["tasks"]}-'
+        f'{workflow_status}-{int(workflow_running)}"'
+    )
+    cached = not_modified(request, response, etag)
+    if cached is not None:
+        return cached
+    
     return {
         "status": "success",
         "system_status": {
@@ -329,29 +496,23 @@ async def get_status():
         }
     }
 
+async def process_uploads(files: List[UploadFile]):
+    """Read uploaded files into memory and convert them to markdown."""
+    # Hand the upload bytes straight to the processor instead of copying
+    # them into a temporary directory first
+    contents = [await file.read() for file in files]
+    filenames = [file.filename for file in files]
+    
+    # Process documents with vllm-based Granite model
+    document_markdowns = await process_uploaded_documents_v2(contents, filenames)
+    
+    return document_markdowns, filenames
+
 @app.post("/upload-documents")
 async def upload_documents(files: List[UploadFile] = File(...)):
     """Upload and process documents, returning processed markdown content."""
     try:
-        # Create temporary directory for uploaded files
-        temp_dir = tempfile.mkdtemp(prefix="agent_docs_")
-        file_paths = []
-        filenames = []
-        
-        for file in files:
-            # Save uploaded file to temporary location
-            file_path = os.path.join(temp_dir, file.filename)
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            file_paths.append(file_path)
-            filenames.append(file.filename)
-        
-        # Process documents with vllm-based Granite model
-        document_markdowns = await process_uploaded_documents_v2(file_paths, filenames)
-        
-        # Clean up temporary files
-        shutil.rmtree(temp_dir, ignore_errors=True)
+        document_markdowns, filenames = await process_uploads(files)
         
         return {
             "status": "success",
@@ -405,6 +566,60 @@ async def submit_prompt(request: PromptRequest, background_tasks: BackgroundTask
         "message": "Workflow started"
     }
 
+@app.post("/submit-prompt-with-docs")
+async def submit_prompt_with_docs(
+    background_tasks: BackgroundTasks,
+    prompt: str = Form(...),
+    files: List[UploadFile] = File(default=[])
+):
+    """Upload documents and start the agent workflow in a single request.
+    
+    Avoids sending the processed markdown back to the client only for it to be
+    echoed to /submit-prompt. The two-call path is kept for compatibility.
+    """
+    global workflow_status, current_task_index
+    
+    if workflow_running:
+        return {
+            "status": "error",
+            "message": "Workflow already running"
+        }
+    
+    # Check if agents are available
+    if not agents_dict:
+        initialize_agents()
+    
+    if not agents_dict:
+        return {
+            "status": "error",
+            "message": "Agents not available. Please set OPENAI_API_KEY environment variable."
+        }
+    
+    filenames = []
+    final_prompt = prompt
+    if files:
+        try:
+            document_markdowns, filenames = await process_uploads(files)
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Error processing documents: {str(e)}"
+            }
+        final_prompt = combine_prompt_with_documents_v2(prompt, document_markdowns)
+    
+    # Reset state
+    current_task_index = 0
+    workflow_status = "planning"
+    
+    # Start the workflow in background
+    background_tasks.add_task(run_agent_workflow, final_prompt)
+    
+    return {
+        "status": "success",
+        "message": "Workflow started",
+        "filenames": filenames
+    }
+
 @app.post("/reset")
 async def reset_system():
     """Reset the system state and clear workspace."""
@@ -417,18 +632,22 @@ async def reset_system():
     current_conversation.clear()
     current_task_index = 0
     workflow_status = "idle"
+    bump_version("messages", "tasks")
+    publish_event("snapshot", [])
     
     # Clear .agent_workspace directory
-    workspace_path = Path(".agent_workspace")
-    if workspace_path.exists():
-        try:
-            for item in workspace_path.iterdir():
-                if item.is_file():
-                    item.unlink()
-                elif item.is_dir():
-                    shutil.rmtree(item)
-        except Exception as e:
-            print(f"Warning: Could not fully clear workspace: {e}")
+    # scandir's cached entry types avoid a stat per item; a missing workspace is simply skipped
+    try:
+        with os.scandir(".agent_workspace") as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    Path(entry.path).unlink(missing_ok=True)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Warning: Could not fully clear workspace: {e}")
     
     return {
         "status": "success",
@@ -437,6 +656,7 @@ async def reset_system():
 
 if __name__ == "__main__":
     import uvicorn
+    logging.basicConfig(level=logging.INFO)
     print("🚀 Starting Real Agent Communication Bridge...")
     print("📡 Frontend can connect to: http://localhost:8000")
     print("📚 API docs available at: http://localhost:8000/docs")
@@ -6,7 +6,9 @@ This script provides clear instructions and starts the system components.
 
 import os
 import sys
+import signal
 import subprocess
+import importlib.util
 import time
 from pathlib import Path
 
@@ -20,15 +22,13 @@ def check_requirements():
         print("   Expected structure: agents/, tools/, frontend/")
         return False
     
-    # Check Python packages
-    try:
-        import fastapi
-        import uvicorn
-        print("✓ FastAPI and uvicorn are installed")
-    except ImportError:
+    # Check Python packages (find_spec locates them without paying the import cost;
+    # the backend process does the real import)
+    if importlib.util.find_spec("fastapi") is None or importlib.util.find_spec("uvicorn") is None:
         print("❌ Error: FastAPI or uvicorn not installed")
         print("   Run: pip install fastapi uvicorn")
         return False
+    print("✓ FastAPI and uvicorn are installed")
     
     # Check if frontend dependencies are installed
     frontend_path = Path("frontend")
@@ -55,21 +55,32 @@ def check_api_key():
         print("✓ OpenAI API key is configured")
         return True
 
+def _launch(command, cwd=None):
+    """Start a server in its own process group so it can be stopped as a unit."""
+    if os.name == "posix":
+        return subprocess.Popen(command, cwd=cwd, start_new_session=True)
+    return subprocess.Popen(command, cwd=cwd, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+
+def _terminate(process):
+    """Send SIGTERM to a server's whole process group (npm spawns children)."""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGTERM)
+        else:
+            process.terminate()
+    except ProcessLookupError:
+        pass
+
 def start_backend():
     """Start the backend server."""
     print("\n🚀 Starting backend server...")
     print("   Backend will be available at: http://localhost:8000")
     print("   API documentation at: http://localhost:8000/docs")
     
-    try:
-        # Start the real agent bridge
-        subprocess.run([
-            sys.executable, "real_agent_bridge.py"
-        ], check=True)
-    except KeyboardInterrupt:
-        print("\n⚠️  Backend server stopped by user")
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error starting backend: {e}")
+    # Start the real agent bridge
+    return "Backend", _launch([sys.executable, "real_agent_bridge.py"])
 
 def start_frontend():
     """Start the frontend development server."""
@@ -77,14 +88,34 @@ def start_frontend():
     print("   Frontend will be available at: http://localhost:5173")
     
     try:
-        os.chdir("frontend")
-        subprocess.run(["npm", "run", "dev"], check=True)
-    except KeyboardInterrupt:
-        print("\n⚠️  Frontend server stopped by user")
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error starting frontend: {e}")
+        return "Frontend", _launch(["npm", "run", "dev"], cwd="frontend")
     except FileNotFoundError:
         print("❌ Error: npm not found. Please install Node.js")
+        return None
+
+def run_servers(*servers):
+    """Wait on the started servers; stop all of them on Ctrl-C or when one exits."""
+    servers = [server for server in servers if server is not None]
+    if not servers:
+        return
+    
+    print("\n   Press Ctrl+C to stop")
+    try:
+        while all(process.poll() is None for _, process in servers):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\n⚠️  Servers stopped by user")
+    finally:
+        for _, process in servers:
+            _terminate(process)
+        for name, process in servers:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            if process.returncode not in (0, -signal.SIGTERM):
+                print(f"❌ {name} exited with code {process.returncode}")
 
 def show_usage_instructions():
     """Show instructions for using the system."""
@@ -139,14 +170,11 @@ def main():
         choice = input("\nEnter your choice (1-4) [3]: ").strip() or "3"
         
         if choice == "1":
-            start_backend()
+            run_servers(start_backend())
         elif choice == "2":
-            start_frontend()
+            run_servers(start_frontend())
         elif choice == "3":
-            print("\n📝 To start both servers:")
-            print("   Terminal 1: python real_agent_bridge.py")
-            print("   Terminal 2: cd frontend && npm run dev")
-            print("\n   Or use the provided scripts in separate terminals")
+            run_servers(start_backend(), start_frontend())
         elif choice == "4":
             print("\n✓ Instructions shown above")
         else:
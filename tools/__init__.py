@@ -1,27 +1,45 @@
 """
 Tools package for the coding assistant system.
 Contains all tool functions organized by category.
+
+Tool modules are imported on first attribute access (PEP 562), so callers that
+only need e.g. read_file don't pay for the Neo4j/GraphRAG imports.
 """
 
-from .file_operations import read_file, list_directory, write_file
-from .coding_tools import create_function, fix_function, finalize_function
-from .testing_tools import write_unit_tests, run_unit_tests, setup_test_environment
-from .database_tools import kg_updater, kg_retriever
+import importlib
 
-__all__ = [
+# Public name -> submodule that defines it
+_LAZY = {
     # File operations
-    'read_file',
-    'list_directory', 
-    'write_file',
+    'read_file': '.file_operations',
+    'list_directory': '.file_operations',
+    'write_file': '.file_operations',
     # Coding tools
-    'create_function',
-    'fix_function',
-    'finalize_function',
+    'create_function': '.coding_tools',
+    'fix_function': '.coding_tools',
+    'finalize_function': '.coding_tools',
+    'finalize_functions': '.coding_tools',
     # Testing tools
-    'write_unit_tests',
-    'run_unit_tests',
-    'setup_test_environment',
+    'write_unit_tests': '.testing_tools',
+    'run_unit_tests': '.testing_tools',
+    'setup_test_environment': '.testing_tools',
     # Database tools
-    'kg_updater',
-    'kg_retriever'
-]
+    'kg_updater': '.database_tools',
+    'kg_retriever': '.database_tools',
+    'kg_job_status': '.database_tools',
+    'CachedEmbedder': '.database_tools',
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,73 @@
+"""
+Filesystem helpers shared by the tool modules.
+"""
+
+import os
+import tempfile
+from typing import Optional, Union
+
+
+def _read_umask() -> int:
+    """The process umask, without changing it where the platform allows."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    # Otherwise it can only be read by setting it; the restrictive placeholder
+    # means a file created by another thread meanwhile is never too permissive
+    umask = os.umask(0o077)
+    os.umask(umask)
+    return umask
+
+
+# Process umask, read once at import, for the permissions of newly created
+# files (mkstemp uses 0600)
+UMASK = _read_umask()
+
+
+def write_all(fd: int, data: bytes) -> None:
+    """Write all of data to a raw file descriptor."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def atomic_write_bytes(
+    path: Union[str, os.PathLike],
+    data: bytes,
+    mode: Optional[int] = None,
+    fsync: bool = False
+) -> None:
+    """Replace path with data, so readers never see a partially written file.
+
+    The data goes to a uniquely named sibling temp file, renamed over path.
+    The file gets mode, else the mode of the file it replaces, else
+    0666 less the umask. With fsync, the data is flushed to disk first.
+    """
+    path = os.fspath(path)
+    if mode is None:
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~UMASK
+    directory, name = os.path.split(path)
+    fd, tmp = tempfile.mkstemp(dir=directory or ".", prefix=name + ".", suffix=".tmp")
+    try:
+        try:
+            if hasattr(os, "fchmod"):
+                # On the open descriptor: no second path lookup of the temp file
+                os.fchmod(fd, mode)
+            else:
+                os.chmod(tmp, mode)
+            write_all(fd, data)
+            if fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,68 @@
+"""
+JSON helpers shared by the tool modules.
+Uses orjson when installed (several times faster), stdlib json otherwise.
+"""
+
+import json
+from typing import Any, Union
+
+# orjson is optional; its decode error subclasses json.JSONDecodeError
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSONDecodeError = json.JSONDecodeError
+
+# Scores or vectors may come back as numpy values; property maps from custom
+# Cypher may have non-string keys, which stdlib json also accepts
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+def _default(obj: Any) -> Any:
+    """Stdlib fallback for numpy arrays and scalars, which orjson serializes natively."""
+    tolist = getattr(obj, "tolist", None)
+    if tolist is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return tolist()
+
+
+# Stdlib fallback: reusable encoders with orjson-style output (compact, UTF-8 as is)
+_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default)
+_SORTED_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default, sort_keys=True)
+_INDENT_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False, default=_default)
+
+
+def _options(indent: bool, sort_keys: bool) -> int:
+    option = _ORJSON_OPTIONS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return option
+
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 bytes, indented by two spaces when indent is set."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=_options(indent, False))
+    return (_INDENT_ENCODER if indent else _ENCODER).encode(obj).encode("utf-8")
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+    """Serialize a tool response compactly, or indented by two spaces when indent is set.
+
+    sort_keys gives a canonical form, e.g. for cache keys.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=_options(indent, sort_keys)).decode()
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=_default, sort_keys=sort_keys)
+    return (_SORTED_ENCODER if sort_keys else _ENCODER).encode(obj)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON text or UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
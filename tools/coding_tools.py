@@ -3,9 +3,198 @@ Coding tools for the coding assistant system.
 Contains functions for creating and fixing functions.
 """
 
-import json
-from typing import Annotated
-from pathlib import Path
+import ast
+import os
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Annotated, Optional, Tuple, List, Dict
+
+from ._fs import atomic_write_bytes, write_all
+from ._json import JSONDecodeError, dumps, loads
+
+
+# Fixed-shape error responses, filled with individually JSON-encoded fields
+_ERR_SYNTAX_CREATE = '{{"status":"error","message":{message},"error_line":{line},"error_text":{text}}}'
+_ERR_SYNTAX_FIX = '{{"status":"error","message":{message},"error_line":{line}}}'
+_ERR_MESSAGE = '{{"status":"error","message":{message}}}'
+
+
+def _error(message: str) -> str:
+    return _ERR_MESSAGE.format(message=dumps(message))
+
+
+# Parse results keyed by a digest of the source; agents often resubmit the
+# same code (retries, create followed by fix), so skip re-parsing it.
+# Value is None for valid code, else (message, lineno, text).
+SyntaxErrorInfo = Tuple[str, Optional[int], Optional[str]]
+_SYNTAX_CACHE_SIZE = 512
+_syntax_cache: "OrderedDict[bytes, Optional[SyntaxErrorInfo]]" = OrderedDict()
+_syntax_cache_lock = threading.Lock()
+
+
+_WORKSPACE = ".agent_workspace"
+_workspace_ready = False
+
+
+def _ensure_workspace() -> str:
+    """Create the workspace directory once per process instead of on every call."""
+    global _workspace_ready
+    if not _workspace_ready:
+        try:
+            os.mkdir(_WORKSPACE)
+        except FileExistsError:
+            pass
+        _workspace_ready = True
+    return _WORKSPACE
+
+
+# Code of the temp files written by create_function/fix_function, keyed by path.
+# The files stay on disk (the tester imports them and the UI lists them), but
+# finalize_function takes the code from here when the file is unchanged
+# (same mtime and size) instead of reading it back.
+_temp_store: "dict[str, Tuple[bytes, int, int]]" = {}
+_temp_store_lock = threading.Lock()
+
+# Digest of the code last written to each temp path; resubmitting identical
+# code (common in agent retry loops) skips the write while the file is current
+_written: "dict[str, str]" = {}
+
+
+def _code_digest(code_bytes: bytes) -> str:
+    return hashlib.blake2b(code_bytes, digest_size=12).hexdigest()
+
+
+def _write_temp(temp_file: str, data: bytes) -> None:
+    global _workspace_ready
+    try:
+        atomic_write_bytes(temp_file, data)
+    except FileNotFoundError:
+        # Workspace was removed since we created it
+        _workspace_ready = False
+        _ensure_workspace()
+        atomic_write_bytes(temp_file, data)
+    st = os.stat(temp_file)
+    with _temp_store_lock:
+        _temp_store[temp_file] = (data, st.st_mtime_ns, st.st_size)
+
+
+def _temp_is_current(path: str, digest: str) -> bool:
+    """True if path still holds the code with this digest, as last written here."""
+    with _temp_store_lock:
+        if _written.get(path) != digest:
+            return False
+        entry = _temp_store.get(path)
+    if entry is None:
+        return False
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    return st.st_mtime_ns == entry[1] and st.st_size == entry[2]
+
+
+def _write_temp_if_changed(temp_file: str, data: bytes, digest: str) -> None:
+    """Write the temp file unless it already holds this code; errors propagate to the caller."""
+    path = os.path.normpath(temp_file)
+    if _temp_is_current(path, digest):
+        return
+    _write_temp(temp_file, data)
+    with _temp_store_lock:
+        _written[path] = digest
+
+
+def _read_temp(temp_file: str) -> bytes:
+    """Return the UTF-8 code of a temp file, from memory when it is unchanged on disk."""
+    with _temp_store_lock:
+        entry = _temp_store.pop(os.path.normpath(temp_file), None)
+    if entry is not None:
+        data, mtime_ns, size = entry
+        st = os.stat(temp_file)
+        if st.st_mtime_ns == mtime_ns and st.st_size == size:
+            return data
+    with open(temp_file, 'rb') as f:
+        return f.read()
+
+
+_TRAILING_WHITESPACE = b" \t\n\r\x0b\x0c"
+
+
+def _append_code(target_path: str, data: bytes) -> None:
+    """
+    Append code to an existing file, separated by two blank lines.
+    
+    Equivalent to rewriting existing.rstrip() + b"\n\n\n" + data, but only the
+    trailing whitespace is read (backwards, in small blocks) and truncated; the
+    rest of the file is never read or rewritten.
+    """
+    fd = os.open(target_path, os.O_RDWR | os.O_APPEND)
+    try:
+        end = os.fstat(fd).st_size
+        keep = end
+        while keep > 0:
+            start = max(0, keep - 64)
+            os.lseek(fd, start, os.SEEK_SET)
+            stripped = os.read(fd, keep - start).rstrip(_TRAILING_WHITESPACE)
+            keep = start + len(stripped)
+            if stripped:
+                break
+        if keep < end:
+            os.ftruncate(fd, keep)
+        write_all(fd, b"\n\n\n" + data)
+    finally:
+        os.close(fd)
+
+
+def _create_file(target_path: str, data: bytes) -> None:
+    """Write code to a new file, creating parent directories as needed."""
+    parent = os.path.dirname(target_path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    atomic_write_bytes(target_path, data)
+
+
+def _validate_syntax(code: str, code_bytes: bytes) -> Optional[SyntaxErrorInfo]:
+    """Parse code once; return None if valid, else (message, lineno, text).
+    
+    code_bytes is code's UTF-8 encoding, computed once by the caller and reused
+    for the cache key and the file write.
+    """
+    digest = hashlib.blake2b(code_bytes, digest_size=16).digest()
+    with _syntax_cache_lock:
+        if digest in _syntax_cache:
+            _syntax_cache.move_to_end(digest)
+            return _syntax_cache[digest]
+    
+    # ast.parse stops after parsing: no symbol table or bytecode, unlike compile()
+    try:
+        ast.parse(code, '<string>', 'exec')
+        result = None
+    except SyntaxError as e:
+        result = (str(e), e.lineno, e.text)
+    
+    with _syntax_cache_lock:
+        _syntax_cache[digest] = result
+        if len(_syntax_cache) > _SYNTAX_CACHE_SIZE:
+            _syntax_cache.popitem(last=False)
+    return result
+
+
+def _stage_function(function_name: str, code: str) -> Tuple[Optional[SyntaxErrorInfo], str, str]:
+    """Validate code and write it to the function's temp file for review.
+    
+    Shared body of create_function and fix_function. Returns
+    (syntax_error, temp_file, digest); nothing is written when syntax_error is set.
+    """
+    code_bytes = code.encode('utf-8')
+    syntax_error = _validate_syntax(code, code_bytes)
+    if syntax_error:
+        return syntax_error, "", ""
+    
+    temp_file = os.path.join(_ensure_workspace(), f"{function_name}_temp.py")
+    digest = _code_digest(code_bytes)
+    _write_temp_if_changed(temp_file, code_bytes, digest)
+    return None, temp_file, digest
 
 
 def create_function(
@@ -15,36 +204,26 @@ def create_function(
 ) -> str:
     """Create a new function and save it to the specified file."""
     try:
-        # Validate the code by trying to compile it
-        compile(function_code, '<string>', 'exec')
+        # Validate the code and store it temporarily for orchestrator review
+        syntax_error, temp_file, digest = _stage_function(function_name, function_code)
+        if syntax_error:
+            message, lineno, text = syntax_error
+            return _ERR_SYNTAX_CREATE.format(
+                message=dumps(f"Syntax error in function code: {message}"),
+                line=dumps(lineno),
+                text=dumps(text)
+            )
         
-        # Store the function code temporarily for orchestrator review
-        temp_storage_path = Path(".agent_workspace")
-        temp_storage_path.mkdir(exist_ok=True)
-        
-        temp_file = temp_storage_path / f"{function_name}_temp.py"
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(function_code)
-        
-        return json.dumps({
+        return dumps({
             "status": "success",
             "message": f"Function '{function_name}' created successfully",
-            "temp_file": str(temp_file),
+            "temp_file": temp_file,
+            "digest": digest,
             "target_file": file_path,
             "function_name": function_name
         })
-    except SyntaxError as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Syntax error in function code: {str(e)}",
-            "error_line": e.lineno,
-            "error_text": e.text
-        })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Error creating function: {str(e)}"
-        })
+        return _error(f"Error creating function: {str(e)}")
 
 
 def fix_function(
@@ -54,69 +233,113 @@ def fix_function(
 ) -> str:
     """Fix a problematic function based on test results or errors."""
     try:
-        # Validate the fixed code
-        compile(fixed_code, '<string>', 'exec')
-        
-        temp_storage_path = Path(".agent_workspace")
-        temp_file = temp_storage_path / f"{function_name}_temp.py"
-        
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            f.write(fixed_code)
+        # Validate the fixed code and replace the temp file
+        syntax_error, temp_file, digest = _stage_function(function_name, fixed_code)
+        if syntax_error:
+            message, lineno, _ = syntax_error
+            return _ERR_SYNTAX_FIX.format(
+                message=dumps(f"Syntax error in fixed code: {message}"),
+                line=dumps(lineno)
+            )
         
-        return json.dumps({
+        return dumps({
             "status": "success",
             "message": f"Function '{function_name}' fixed successfully",
-            "temp_file": str(temp_file),
+            "temp_file": temp_file,
+            "digest": digest,
             "fix_applied": error_details
         })
-    except SyntaxError as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Syntax error in fixed code: {str(e)}",
-            "error_line": e.lineno
-        })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Error fixing function: {str(e)}"
-        })
+        return _error(f"Error fixing function: {str(e)}")
 
 
 def finalize_function(
     function_name: Annotated[str, "Name of the function to finalize"],
     target_file: Annotated[str, "Target file path where the function should be added"],
-    temp_file: Annotated[str, "Temporary file containing the approved function code"]
+    temp_file: Annotated[str, "Temporary file containing the approved function code"],
+    digest: Annotated[Optional[str], "Digest returned by create_function/fix_function for the approved code"] = None
 ) -> str:
     """Finalize a function by adding it to the target file after tests pass."""
     try:
-        # Read the function from temp file
-        with open(temp_file, 'r', encoding='utf-8') as f:
-            function_code = f.read()
+        # Read the function from temp file (served from memory when unchanged)
+        code_bytes = _read_temp(temp_file)
+        if digest and _code_digest(code_bytes) != digest:
+            return _error(f"Temp file {temp_file} no longer holds the approved code (digest {digest})")
         
-        target_path = Path(target_file)
+        target_path = os.path.normpath(target_file)
         
         # If target file exists, append; otherwise create new
-        if target_path.exists():
-            with open(target_path, 'r', encoding='utf-8') as f:
-                existing_content = f.read()
-            
-            # Add newlines for separation
-            new_content = existing_content.rstrip() + "\n\n\n" + function_code
-        else:
-            target_path.parent.mkdir(parents=True, exist_ok=True)
-            new_content = function_code
+        try:
+            _append_code(target_path, code_bytes)
+        except FileNotFoundError:
+            _create_file(target_path, code_bytes)
         
-        # Write to target file
-        with open(target_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        
-        return json.dumps({
+        return dumps({
             "status": "success",
             "message": f"Function '{function_name}' finalized and added to {target_file}",
-            "file": str(target_path)
+            "file": target_path
         })
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "message": f"Error finalizing function: {str(e)}"
-        })
+        return _error(f"Error finalizing function: {str(e)}")
+
+
+def finalize_functions(
+    items: Annotated[str, "JSON array string of functions to finalize, each an object with function_name, target_file, temp_file and optionally digest"]
+) -> str:
+    """Finalize several approved functions at once, writing each target file only once."""
+    try:
+        items = loads(items)
+    except JSONDecodeError as e:
+        return _error(f"Invalid JSON format for items: {str(e)}")
+    if not isinstance(items, list):
+        return _error("items must be a JSON array of objects")
+    
+    results: List[Dict[str, str]] = []
+    by_target: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+    
+    # Read every function first; a bad item is reported without blocking the rest
+    for item in items:
+        function_name = item.get("function_name", "") if isinstance(item, dict) else ""
+        try:
+            if not isinstance(item, dict) or not all(
+                isinstance(item.get(key), str) for key in ("function_name", "target_file", "temp_file")
+            ):
+                raise ValueError("each item must be an object with string function_name, target_file and temp_file")
+            code_bytes = _read_temp(item["temp_file"])
+            digest = item.get("digest")
+            if digest and _code_digest(code_bytes) != digest:
+                raise ValueError(f"Temp file {item['temp_file']} no longer holds the approved code (digest {digest})")
+            by_target[item["target_file"]].append((function_name, code_bytes))
+        except Exception as e:
+            results.append({
+                "function_name": function_name,
+                "status": "error",
+                "message": f"Error finalizing function: {str(e)}"
+            })
+    
+    for target_file, entries in by_target.items():
+        names = [name for name, _ in entries]
+        codes = [code for _, code in entries]
+        # Same layout as finalizing one by one: each appended block is rstripped
+        # and followed by two blank lines before the next
+        payload = b"\n\n\n".join([code.rstrip(_TRAILING_WHITESPACE) for code in codes[:-1]] + codes[-1:])
+        target_path = os.path.normpath(target_file)
+        try:
+            try:
+                _append_code(target_path, payload)
+            except FileNotFoundError:
+                _create_file(target_path, payload)
+            results.extend({
+                "function_name": name,
+                "status": "success",
+                "message": f"Function '{name}' finalized and added to {target_file}",
+                "file": target_path
+            } for name in names)
+        except Exception as e:
+            results.extend({
+                "function_name": name,
+                "status": "error",
+                "message": f"Error finalizing function: {str(e)}"
+            } for name in names)
+    
+    return dumps(results)
@@ -3,11 +3,37 @@ Database tools for the Neo4j GraphRAG system.
 Handles knowledge graph updates and retrieval operations.
 """
 
-import json
 import os
+import re
+import time
+import atexit
+import hashlib
+import sqlite3
+import struct
+import threading
+import functools
+import itertools
+from collections import OrderedDict
 from typing import Annotated, Optional, List, Dict, Any
 from pathlib import Path
 import asyncio
+import queue
+import uuid
+
+from ._json import JSONDecodeError, dumps, loads
+
+# numpy is optional; only the in-process vector search (KG_LOCAL_VECTOR_SEARCH) needs it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# faiss is optional; when installed the in-process vector search uses its SIMD
+# inner-product index instead of a numpy matrix-vector product
+try:
+    import faiss
+except ImportError:
+    faiss = None
 
 # Neo4j imports
 try:
@@ -21,60 +47,449 @@ except ImportError:
 try:
     from neo4j_graphrag.experimental.components.text_splitters.fixed_size_splitter import FixedSizeSplitter
     from neo4j_graphrag.experimental.components.entity_relation_extractor import LLMEntityRelationExtractor
-    from neo4j_graphrag.experimental.components.embedder import TextChunkEmbedder
     from neo4j_graphrag.experimental.components.kg_writer import Neo4jWriter
     from neo4j_graphrag.experimental.components.schema import SchemaBuilder, NodeType, RelationshipType, PropertyType
     from neo4j_graphrag.experimental.components.types import TextChunks, TextChunk
     from neo4j_graphrag.llm import OpenAILLM
+    from neo4j_graphrag.embeddings.base import Embedder
     from neo4j_graphrag.embeddings.openai import OpenAIEmbeddings
     from neo4j_graphrag.retrievers import VectorRetriever, VectorCypherRetriever
+    from neo4j_graphrag.types import RetrieverResultItem
     GRAPHRAG_AVAILABLE = True
 except ImportError:
     GRAPHRAG_AVAILABLE = False
     print("Warning: neo4j-graphrag package not installed. Install with: pip install neo4j-graphrag")
 
 
-# Haystack + Neo4j integration (optional, separate from GraphRAG)
-try:
-    from haystack import Document
-    from haystack.components.embedders import SentenceTransformersDocumentEmbedder
-    from haystack.components.retrievers.neo4j import Neo4jEmbeddingRetriever
-    from neo4j_haystack import Neo4jDocumentStore
-    HAYSTACK_NEO4J_AVAILABLE = True
-except Exception:
-    HAYSTACK_NEO4J_AVAILABLE = False
-    print("Warning: haystack-ai or neo4j-haystack not installed. Install with: pip install 'haystack-ai>=2.0.0' neo4j-haystack")
+# Haystack + Neo4j integration (optional, separate from GraphRAG). Haystack pulls in
+# sentence-transformers/torch, so it is imported on the first hs_* call, not here;
+# None means not tried yet.
+HAYSTACK_NEO4J_AVAILABLE: Optional[bool] = None
 
 
-def get_neo4j_connection():
-    """Get Neo4j connection from environment variables."""
-    uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-    username = os.getenv("NEO4J_USERNAME", "neo4j")
-    password = os.getenv("NEO4J_PASSWORD", "passw0rd")
+def _haystack_available() -> bool:
+    """Import the Haystack integration on first use; return whether it is installed."""
+    global HAYSTACK_NEO4J_AVAILABLE, Document, SentenceTransformersDocumentEmbedder
+    global SentenceTransformersTextEmbedder, Neo4jEmbeddingRetriever, Neo4jDocumentStore, Neo4jClientConfig
+    if HAYSTACK_NEO4J_AVAILABLE is None:
+        try:
+            from haystack import Document
+            from haystack.components.embedders import (
+                SentenceTransformersDocumentEmbedder,
+                SentenceTransformersTextEmbedder,
+            )
+            from haystack.components.retrievers.neo4j import Neo4jEmbeddingRetriever
+            from neo4j_haystack import Neo4jClientConfig, Neo4jDocumentStore
+            HAYSTACK_NEO4J_AVAILABLE = True
+        except Exception:
+            HAYSTACK_NEO4J_AVAILABLE = False
+            print("Warning: haystack-ai or neo4j-haystack not installed. Install with: pip install 'haystack-ai>=2.0.0' neo4j-haystack")
+    return HAYSTACK_NEO4J_AVAILABLE
+
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBED_CACHE_SIZE = 10_000
+# Inputs per embeddings request; 2048 is OpenAI's limit, lower it to ease rate limits
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "2048"))
+# Directory of the persistent embedding cache; set EMBED_CACHE_DIR="" to disable it
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", ".embed_cache")
+EMBED_DISK_LIMIT = 512 * 1024 * 1024
+# Reuse the embedding of a near-duplicate chunk (simhash distance <= 3); opt-in
+EMBED_FUZZY_REUSE = os.getenv("EMBED_FUZZY_REUSE") == "1"
+EMBED_FUZZY_DISTANCE = 3
+
+# Process-wide LRU of embedding vectors keyed by sha256(model + "\0" + text),
+# backed by a SQLite file so vectors survive restarts
+_embed_cache: "OrderedDict[bytes, List[float]]" = OrderedDict()
+_embed_cache_lock = threading.Lock()
+_embed_db: Optional[sqlite3.Connection] = None
+# cache key -> 64-bit simhash of the normalized text, for fuzzy reuse
+_simhashes: "OrderedDict[bytes, int]" = OrderedDict()
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize_text(text: str) -> str:
+    """Canonical form for chunk cache keys: collapsed whitespace, lowercase."""
+    return _WHITESPACE_RE.sub(" ", text.strip().lower())
+
+
+def _simhash(text: str) -> int:
+    """64-bit simhash over the words of already-normalized text."""
+    weights = [0] * 64
+    for token in text.split():
+        h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def _get_embed_db() -> Optional[sqlite3.Connection]:
+    """Open (once) the on-disk embedding cache. Caller must hold _embed_cache_lock."""
+    global _embed_db
+    if _embed_db is None and EMBED_CACHE_DIR:
+        cache_dir = Path(EMBED_CACHE_DIR)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(cache_dir / "embeddings.sqlite3"), check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        # Vectors are stored as packed float16
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings_f16 "
+            "(key BLOB PRIMARY KEY, vector BLOB NOT NULL, created REAL NOT NULL)"
+        )
+        # (Neo4j URI|database|source_info, chunk hash) pairs already written to the graph by kg_updater
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS ingested_chunks "
+            "(source TEXT NOT NULL, hash BLOB NOT NULL, PRIMARY KEY (source, hash))"
+        )
+        _embed_db = db
+    return _embed_db
+
+
+def _pack_vector(vector: List[float]) -> bytes:
+    """Little-endian float16 bytes: a quarter of float64, with ~1e-3 relative
+    error, well below what moves cosine rankings of unit-norm embeddings."""
+    return struct.pack(f"<{len(vector)}e", *vector)
+
+
+def _unpack_vector(blob: bytes) -> List[float]:
+    return list(struct.unpack(f"<{len(blob) // 2}e", blob))
+
+
+class CachedEmbedder(Embedder if GRAPHRAG_AVAILABLE else object):
+    """Embedder wrapper that memoizes vectors by content hash.
+
+    Repeated texts (the same query asked twice, identical chunks re-ingested)
+    are served from the in-process LRU or the on-disk cache instead of another
+    embeddings call. The model name is part of the key so vectors never leak
+    across models.
+    """
+
+    def __init__(self, embedder, model_name: str = EMBEDDING_MODEL, normalize: bool = False):
+        self.embedder = embedder
+        self.model_name = model_name
+        # Key on normalized text so chunks differing only in case/whitespace share a vector
+        self.normalize = normalize
+
+    def _key(self, text: str) -> bytes:
+        if self.normalize:
+            text = _normalize_text(text)
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).digest()
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        vector = self._lookup([key]).get(key)
+        if vector is not None:
+            return vector
+
+        vector = self.embedder.embed_query(text)
+
+        self._store({key: vector})
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed many texts, sending only distinct cache misses in batched requests."""
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        if missing and self.normalize and EMBED_FUZZY_REUSE:
+            found.update(self._fuzzy_reuse(missing))
+            missing = {key: text for key, text in missing.items() if key not in found}
+
+        if missing:
+            miss_keys = list(missing)
+            miss_texts = list(missing.values())
+            client = getattr(self.embedder, "client", None)
+            fresh: Dict[bytes, List[float]] = {}
+            if client is not None:
+                for start in range(0, len(miss_texts), EMBED_BATCH_SIZE):
+                    response = client.embeddings.create(
+                        input=miss_texts[start:start + EMBED_BATCH_SIZE],
+                        model=self.model_name,
+                    )
+                    for item in response.data:
+                        fresh[miss_keys[start + item.index]] = item.embedding
+            else:
+                for key, text in missing.items():
+                    fresh[key] = self.embedder.embed_query(text)
+            self._store(fresh)
+            found.update(fresh)
+            if self.normalize and EMBED_FUZZY_REUSE:
+                with _embed_cache_lock:
+                    for key, text in missing.items():
+                        _simhashes[key] = _simhash(_normalize_text(text))
+                    while len(_simhashes) > EMBED_CACHE_SIZE:
+                        _simhashes.popitem(last=False)
+
+        return [found[key] for key in keys]
+
+    def _fuzzy_reuse(self, missing: Dict[bytes, str]) -> Dict[bytes, List[float]]:
+        """Map misses to vectors of previously embedded near-duplicates, if any."""
+        reused: Dict[bytes, List[float]] = {}
+        with _embed_cache_lock:
+            known = list(_simhashes.items())
+        if not known:
+            return reused
+        for key, text in missing.items():
+            fingerprint = _simhash(_normalize_text(text))
+            match = next(
+                (other for other, h in known if bin(fingerprint ^ h).count("1") <= EMBED_FUZZY_DISTANCE),
+                None,
+            )
+            if match is not None:
+                vector = self._lookup([match]).get(match)
+                if vector is not None:
+                    reused[key] = vector
+        return reused
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        """Return cached vectors for keys: memory first, then disk (promoted to memory)."""
+        found: Dict[bytes, List[float]] = {}
+        with _embed_cache_lock:
+            for key in keys:
+                vector = _embed_cache.get(key)
+                if vector is not None:
+                    _embed_cache.move_to_end(key)
+                    found[key] = vector
+
+            on_disk = [key for key in dict.fromkeys(keys) if key not in found]
+            if on_disk:
+                try:
+                    db = _get_embed_db()
+                    if db is not None:
+                        placeholders = ",".join("?" * len(on_disk))
+                        rows = db.execute(
+                            f"SELECT key, vector FROM embeddings_f16 WHERE key IN ({placeholders})",
+                            on_disk,
+                        ).fetchall()
+                        for key, blob in rows:
+                            vector = _unpack_vector(blob)
+                            found[key] = vector
+                            _embed_cache[key] = vector
+                        self._trim_memory()
+                except sqlite3.Error:
+                    pass  # disk cache is best-effort
+        return found
+
+    def _store(self, vectors: Dict[bytes, List[float]]) -> None:
+        with _embed_cache_lock:
+            for key, vector in vectors.items():
+                _embed_cache[key] = vector
+                _embed_cache.move_to_end(key)
+            self._trim_memory()
+
+            try:
+                db = _get_embed_db()
+                if db is None:
+                    return
+                now = time.time()
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO embeddings_f16 (key, vector, created) VALUES (?, ?, ?)",
+                        [(key, _pack_vector(vector), now) for key, vector in vectors.items()],
+                    )
+                    page_count = db.execute("PRAGMA page_count").fetchone()[0]
+                    page_size = db.execute("PRAGMA page_size").fetchone()[0]
+                    if page_count * page_size > EMBED_DISK_LIMIT:
+                        # Drop the oldest tenth of the entries to stay under the size limit
+                        db.execute(
+                            "DELETE FROM embeddings_f16 WHERE key IN "
+                            "(SELECT key FROM embeddings_f16 ORDER BY created LIMIT "
+                            "(SELECT COUNT(*) / 10 + 1 FROM embeddings_f16))"
+                        )
+            except sqlite3.Error:
+                pass  # disk cache is best-effort
+
+    @staticmethod
+    def _trim_memory() -> None:
+        while len(_embed_cache) > EMBED_CACHE_SIZE:
+            _embed_cache.popitem(last=False)
+
+
+@functools.lru_cache(maxsize=1)
+def _neo4j_config() -> tuple:
+    """(uri, username, password) from the environment, read once per process."""
+    return (
+        os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+        os.getenv("NEO4J_USERNAME", "neo4j"),
+        os.getenv("NEO4J_PASSWORD", "passw0rd"),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _neo4j_driver_config() -> dict:
+    """Connection pool settings shared by the GraphRAG driver and the Haystack stores.
     
+    A bounded acquisition timeout turns pool exhaustion under concurrent tool
+    calls into an error instead of an open-ended stall; connections idle longer
+    than the liveness timeout are checked before reuse.
+    """
+    return {
+        "max_connection_pool_size": int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", "50")),
+        "connection_acquisition_timeout": float(os.getenv("NEO4J_ACQ_TIMEOUT", "30")),
+        "max_connection_lifetime": int(os.getenv("NEO4J_MAX_LIFETIME", "3000")),
+        "liveness_check_timeout": float(os.getenv("NEO4J_LIVENESS", "30")),
+        "keep_alive": True,
+    }
+
+
+# Database for every query, session, GraphRAG writer and retriever. Naming it
+# saves the driver resolving the user's home database; unset means the home
+# database.
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE") or None
+
+
+def _graphrag_database_kwargs() -> dict:
+    """neo4j_database for GraphRAG writers and retrievers, only when a database is configured."""
+    return {"neo4j_database": NEO4J_DATABASE} if NEO4J_DATABASE else {}
+
+
+_driver = None
+_driver_lock = threading.Lock()
+
+
+def get_neo4j_connection():
+    """Get the shared Neo4j driver, created from environment variables on first use.
+
+    The driver owns a connection pool and is thread-safe, so every tool call
+    reuses it instead of paying a fresh TCP + auth handshake. It is closed at exit.
+    """
+    global _driver
     if not NEO4J_AVAILABLE:
         raise ImportError("neo4j package not installed")
     
-    return GraphDatabase.driver(uri, auth=(username, password))
+    with _driver_lock:
+        if _driver is None:
+            uri, username, password = _neo4j_config()
+            _driver = GraphDatabase.driver(
+                uri,
+                auth=(username, password),
+                **_neo4j_driver_config(),
+            )
+            atexit.register(_driver.close)
+        return _driver
+
+
+@functools.lru_cache(maxsize=4)
+def _get_openai_embedder(model: str = EMBEDDING_MODEL, normalize: bool = False) -> "CachedEmbedder":
+    """Shared caching OpenAI embedder per (model, normalize); its HTTP client is reused across calls."""
+    return CachedEmbedder(OpenAIEmbeddings(model=model), model_name=model, normalize=normalize)
+
+
+# SentenceTransformers inference backend for the hs_* tools. "onnx" runs the
+# model's int8-quantized ONNX export (several times faster on CPU, <1% quality
+# delta); it falls back to torch FP32 when onnxruntime/optimum or the file is
+# missing. Upserts and queries must use the same backend.
+ST_BACKEND = os.getenv("ST_BACKEND", "onnx")
+ST_ONNX_FILE = os.getenv("ST_ONNX_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+# Default encoding batch for hs upserts; larger batches keep a GPU busy and still
+# help on CPU. The device (CUDA, then MPS, then CPU) is picked by Haystack.
+ST_BATCH_SIZE = int(os.getenv("ST_BATCH_SIZE", "128"))
+
+
+def _load_st_embedder(component_cls, model: str, backend: str, **kwargs):
+    """Build and warm up a SentenceTransformers component on backend, falling back to torch."""
+    if backend == "onnx":
+        try:
+            embedder = component_cls(
+                model=model, backend="onnx", model_kwargs={"file_name": ST_ONNX_FILE}, **kwargs
+            )
+            embedder.warm_up()
+            return embedder
+        except Exception as e:
+            print(f"Warning: ONNX backend unavailable for {model} ({e}); using torch")
+    embedder = component_cls(model=model, **kwargs)
+    embedder.warm_up()
+    return embedder
+
+
+@functools.lru_cache(maxsize=4)
+def _get_st_embedder(model: str, batch_size: int = ST_BATCH_SIZE, backend: str = ST_BACKEND) -> "SentenceTransformersDocumentEmbedder":
+    """Shared SentenceTransformers embedder per (model, batch_size, backend), loaded only once."""
+    return _load_st_embedder(SentenceTransformersDocumentEmbedder, model, backend, batch_size=batch_size)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_st_text_embedder(model: str, backend: str = ST_BACKEND) -> "SentenceTransformersTextEmbedder":
+    """Shared SentenceTransformers query embedder per (model, backend), loaded only once."""
+    return _load_st_embedder(SentenceTransformersTextEmbedder, model, backend)
+
+
+@functools.lru_cache(maxsize=1024)
+def _embed_st_query(model: str, text: str, backend: str = ST_BACKEND) -> tuple:
+    """Embedding of a query string; repeated queries skip the encode."""
+    return tuple(_get_st_text_embedder(model, backend).run(text=text)["embedding"])
+
+
+# Documents per UNWIND write transaction in the hs_* document stores
+# (neo4j-haystack defaults to 100)
+HS_WRITE_BATCH_SIZE = int(os.getenv("HS_WRITE_BATCH_SIZE", "500"))
+
+
+@functools.lru_cache(maxsize=8)
+def _get_document_store(
+    database: str,
+    embedding_dim: int,
+    embedding_field: str,
+    index: str,
+    node_label: str,
+) -> "Neo4jDocumentStore":
+    """Shared Haystack document store per configuration; each store holds its own driver."""
+    uri, username, password = _neo4j_config()
+    return Neo4jDocumentStore(
+        client_config=Neo4jClientConfig(
+            url=uri,
+            database=database,
+            username=username,
+            password=password,
+            driver_config=dict(_neo4j_driver_config()),
+        ),
+        database=database,
+        embedding_dim=embedding_dim,
+        embedding_field=embedding_field,
+        index=index,
+        node_label=node_label,
+        write_batch_size=HS_WRITE_BATCH_SIZE,
+    )
+
+
+# One event loop, running forever in a daemon thread, shared by every tool call
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="database-tools-loop", daemon=True)
+            _loop_thread.start()
+        return _loop
 
 
 def _run_async_safely(coro):
-    """Run an async coroutine in a way that avoids event loop shutdown issues.
-    - If no loop is running, create one and do not aggressively close it.
-    - If a loop is running (unlikely in our sync tool context), raise a clear error.
+    """Run an async coroutine on the shared background loop and wait for its result.
+    
+    Unlike a fresh loop per call, nothing is leaked, and callers may be inside
+    their own running loop (in another thread). Calling from a coroutine on the
+    shared loop itself would deadlock, so that raises instead.
     """
-    try:
-        running_loop = asyncio.get_running_loop()
-        # Avoid deadlocks by not trying to nest
-        raise RuntimeError("Async loop already running; call this tool from a sync context.")
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        try:
-            asyncio.set_event_loop(loop)
-            return loop.run_until_complete(coro)
-        finally:
-            # Intentionally do not close the loop immediately to allow background cleanup tasks to finish
-            pass
+    loop = _get_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("Cannot block on the database tools loop from within it.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+# Vector indexes already ensured by this process (by name)
+_ensured_indexes: set = set()
 
 
 def _ensure_vector_index(
@@ -84,33 +499,470 @@ def _ensure_vector_index(
     embedding_property: str = "embedding",
     dimensions: int = 1536,
     similarity: str = "cosine",
+    hnsw_m: int = 24,
+    hnsw_ef_construction: int = 128,
 ):
-    """Best-effort creation of a Neo4j native vector index for Chunk embeddings.
+    """Best-effort creation of a Neo4j native (HNSW) vector index for Chunk embeddings.
 
-    Safe to call repeatedly; it will no-op if the index already exists.
+    Without it vector search degrades to a brute-force scan. Runs once per
+    process per index; a no-op server-side if the index already exists.
     """
-    try:
-        with driver.session() as session:
-            exists = session.run(
-                """
-                SHOW INDEXES YIELD name
-                WHERE name = $name
-                RETURN name
-                """,
-                {"name": index_name},
-            ).peek() is not None
-            if exists:
-                return
+    if index_name in _ensured_indexes:
+        return
+    index_config = (
+        f"`vector.dimensions`: {dimensions}, "
+        f"`vector.similarity_function`: '{similarity}'"
+    )
+    hnsw_config = (
+        f", `vector.hnsw.m`: {hnsw_m}, "
+        f"`vector.hnsw.ef_construction`: {hnsw_ef_construction}"
+    )
+    # Servers older than 5.18 reject the HNSW tuning keys; retry with the base config
+    for config in (index_config + hnsw_config, index_config):
+        try:
+            # IF NOT EXISTS makes the existence check server-side, so a single
+            # round trip covers both the "already there" and "create" cases.
             cypher = (
                 f"CREATE VECTOR INDEX {index_name} IF NOT EXISTS "
                 f"FOR (n:`{label}`) ON (n.`{embedding_property}`) "
-                f"OPTIONS {{indexConfig: {{`vector.dimensions`: {dimensions}, "
-                f"`vector.similarity_function`: '{similarity}'}}}}"
+                f"OPTIONS {{indexConfig: {{{config}}}}}"
+            )
+            with driver.session(database=NEO4J_DATABASE) as session:
+                session.run(cypher).consume()
+            _ensured_indexes.add(index_name)
+            return
+        except Exception:
+            # Non-fatal; retrieval will error explicitly if the index is missing
+            continue
+
+
+# Graph expansion for kg_retriever's vector_cypher strategy. Sent verbatim on
+# every search, so the server's plan cache keyed by query text keeps hitting.
+RETRIEVAL_QUERY = """
+MATCH (node)-[:PART_OF_CHUNK]->(chunk:Chunk)
+MATCH (chunk)-[:PART_OF_DOCUMENT]->(doc:Document)
+RETURN node.id AS entity_id,
+       labels(node) AS entity_labels,
+       properties(node) AS entity_properties,
+       chunk.text AS context,
+       doc.path AS source,
+       score
+ORDER BY score DESC
+LIMIT $top_k
+"""
+
+
+def _retrieval_record_item(record) -> "RetrieverResultItem":
+    """Keep every RETRIEVAL_QUERY column; the default formatter only keeps a string form."""
+    return RetrieverResultItem(content=record.get("context"), metadata=record.data())
+
+
+@functools.lru_cache(maxsize=2)
+def _get_vector_retriever(retrieval_query: Optional[str] = None):
+    """Shared chunk_index retriever; a VectorCypherRetriever when retrieval_query is given.
+    
+    Construction looks up the index over Bolt and validates the query, so it
+    happens once per process instead of on every kg_retriever call.
+    """
+    driver = get_neo4j_connection()
+    _ensure_vector_index(driver)
+    embedder = _get_openai_embedder(EMBEDDING_MODEL)
+    if retrieval_query is None:
+        return VectorRetriever(
+            driver=driver, index_name="chunk_index", embedder=embedder, **_graphrag_database_kwargs()
+        )
+    return VectorCypherRetriever(
+        driver=driver,
+        index_name="chunk_index",
+        embedder=embedder,
+        retrieval_query=retrieval_query,
+        result_formatter=_retrieval_record_item,
+        **_graphrag_database_kwargs()
+    )
+
+
+# Opt-in (KG_SKIP_INGESTED=1): skip chunks whose normalized text was already
+# ingested for the same source into the same Neo4j URI and database, so
+# re-ingesting a document only pays for its new chunks. Recorded in the local
+# embedding cache database, which does not notice the graph being wiped; clear
+# ingested_chunks (or leave this off) when the graph may be reset.
+KG_SKIP_INGESTED = os.getenv("KG_SKIP_INGESTED", "0") == "1"
+
+
+def _ingest_key(source_info: str) -> str:
+    """ingested_chunks key for source_info in the configured Neo4j URI and database."""
+    return f"{_neo4j_config()[0]}|{NEO4J_DATABASE or ''}|{source_info}"
+
+
+def _chunk_hash(text: str) -> bytes:
+    return hashlib.blake2b(_normalize_text(text).encode("utf-8"), digest_size=8).digest()
+
+
+def _drop_ingested_chunks(source_info: str, chunks: list) -> tuple:
+    """Split chunks into those still to ingest and a skipped count.
+    
+    Drops duplicates within the document and, with KG_SKIP_INGESTED, chunks
+    already ingested for source_info into the configured database. Returns (kept_chunks, skipped, kept_hashes).
+    """
+    hashes = [_chunk_hash(chunk.text) for chunk in chunks]
+    done = set()
+    if KG_SKIP_INGESTED and hashes:
+        with _embed_cache_lock:
+            try:
+                db = _get_embed_db()
+                if db is not None:
+                    placeholders = ",".join("?" * len(hashes))
+                    done.update(row[0] for row in db.execute(
+                        f"SELECT hash FROM ingested_chunks WHERE source = ? AND hash IN ({placeholders})",
+                        [_ingest_key(source_info), *hashes],
+                    ))
+            except sqlite3.Error:
+                pass  # best-effort, like the embedding cache
+    kept, kept_hashes = [], []
+    for chunk, digest in zip(chunks, hashes):
+        if digest not in done:
+            done.add(digest)
+            kept.append(chunk)
+            kept_hashes.append(digest)
+    return kept, len(chunks) - len(kept), kept_hashes
+
+
+def _record_ingested_chunks(source_info: str, hashes: List[bytes]) -> None:
+    if not KG_SKIP_INGESTED or not hashes:
+        return
+    key = _ingest_key(source_info)
+    with _embed_cache_lock:
+        try:
+            db = _get_embed_db()
+            if db is not None:
+                with db:
+                    db.executemany(
+                        "INSERT OR IGNORE INTO ingested_chunks (source, hash) VALUES (?, ?)",
+                        [(key, digest) for digest in hashes],
+                    )
+        except sqlite3.Error:
+            pass
+
+
+# Chunks whose entities are extracted concurrently (bounded by a semaphore in the
+# extractor); raise up to the OpenAI rate limit
+KG_EXTRACT_CONCURRENCY = int(os.getenv("KG_EXTRACT_CONCURRENCY", "8"))
+
+@functools.lru_cache(maxsize=8)
+def _get_splitter(chunk_size: int, chunk_overlap: int) -> "FixedSizeSplitter":
+    return FixedSizeSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_extractor() -> "LLMEntityRelationExtractor":
+    """Shared entity/relation extractor and its OpenAI LLM client.
+    
+    The LLM's async HTTP client is bound to the event loop it first runs on;
+    all pipelines run on the one shared background loop, so it can be reused.
+    """
+    # Initialize OpenAI LLM for entity extraction
+    llm = OpenAILLM(
+        model_name="gpt-4o-mini",
+        model_params={
+            "max_tokens": 2000,
+            "response_format": {"type": "json_object"},
+            "temperature": 0
+        }
+    )
+    # Try with create_lexical_graph=False first to see if that's causing issues
+    try:
+        return LLMEntityRelationExtractor(
+            llm=llm,
+            create_lexical_graph=True,
+            max_concurrency=KG_EXTRACT_CONCURRENCY
+        )
+    except TypeError:
+        # Older neo4j-graphrag releases have no max_concurrency
+        return LLMEntityRelationExtractor(
+            llm=llm,
+            create_lexical_graph=True
+        )
+
+
+# Rows per UNWIND transaction when writing extracted graphs
+KG_WRITE_BATCH_SIZE = int(os.getenv("KG_WRITE_BATCH_SIZE", "1000"))
+
+
+class _SetupOnceNeo4jWriter(Neo4jWriter if GRAPHRAG_AVAILABLE else object):
+    """Neo4jWriter that runs its schema setup (index creation) on the first write only.
+    
+    The stock writer re-issues its CREATE INDEX on every run; once it has
+    succeeded on this writer's database it is a pure round trip.
+    """
+    _setup_done = False
+
+    def _db_setup(self) -> None:
+        if not self._setup_done:
+            super()._db_setup()
+            self._setup_done = True
+
+
+@functools.lru_cache(maxsize=1)
+def _get_kg_writer() -> "Neo4jWriter":
+    """Shared Neo4jWriter on the shared driver.
+    
+    The writer already upserts through batched UNWIND queries and indexes its
+    temporary node ids; constructing it costs a server-version round trip, so
+    build it once.
+    """
+    driver = get_neo4j_connection()
+    try:
+        return _SetupOnceNeo4jWriter(driver, batch_size=KG_WRITE_BATCH_SIZE, **_graphrag_database_kwargs())
+    except TypeError:
+        # Older neo4j-graphrag releases have no batch_size
+        return _SetupOnceNeo4jWriter(driver, **_graphrag_database_kwargs())
+
+
+# Short-lived cache of kg_retriever responses keyed by (query, retrieval_type, top_k).
+# Results can contain document text, so entries expire after KG_RESULT_CACHE_TTL
+# seconds (0 disables) and the cache is dropped whenever kg_updater writes.
+KG_RESULT_CACHE_TTL = float(os.getenv("KG_RESULT_CACHE_TTL", "300"))
+KG_RESULT_CACHE_SIZE = 1024
+_result_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+
+def _cached_result(key: tuple) -> Optional[Dict[str, Any]]:
+    with _result_cache_lock:
+        entry = _result_cache.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del _result_cache[key]
+            return None
+        _result_cache.move_to_end(key)
+        return value
+
+
+def _cache_result(key: tuple, value: Dict[str, Any]) -> None:
+    if KG_RESULT_CACHE_TTL <= 0:
+        return
+    with _result_cache_lock:
+        _result_cache[key] = (time.monotonic() + KG_RESULT_CACHE_TTL, value)
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > KG_RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
+
+def clear_result_cache() -> None:
+    """Drop cached retrieval results (the graph changed)."""
+    with _result_cache_lock:
+        _result_cache.clear()
+    _invalidate_chunk_mirror()
+
+
+# Opt-in in-process mirror of all Chunk embeddings for single-process setups:
+# "vector" retrieval becomes one matrix-vector product instead of a Neo4j round
+# trip. Costs ~6 KB of RAM per chunk (1536 float32s); reloaded lazily after writes.
+KG_LOCAL_VECTOR_SEARCH = os.getenv("KG_LOCAL_VECTOR_SEARCH") == "1" and np is not None
+_chunk_mirror: Optional[tuple] = None  # (element ids, texts, unit-norm float32 matrix, faiss index)
+_chunk_mirror_lock = threading.Lock()
+
+
+def _invalidate_chunk_mirror() -> None:
+    global _chunk_mirror
+    with _chunk_mirror_lock:
+        _chunk_mirror = None
+
+
+def _get_chunk_mirror(driver, label: str = "Chunk", embedding_property: str = "embedding") -> tuple:
+    """Load (once per graph change) every chunk's id, text and normalized embedding.
+    
+    With faiss installed the vectors are also loaded into an exact IndexFlatIP.
+    """
+    global _chunk_mirror
+    with _chunk_mirror_lock:
+        if _chunk_mirror is None:
+            records, _, _ = driver.execute_query(
+                f"MATCH (c:`{label}`) WHERE c.`{embedding_property}` IS NOT NULL "
+                f"RETURN elementId(c) AS id, c.text AS text, c.`{embedding_property}` AS embedding",
+                database_=NEO4J_DATABASE,
             )
-            session.run(cypher)
-    except Exception:
-        # Non-fatal; retrieval will error explicitly if the index is missing
-        pass
+            ids = [record["id"] for record in records]
+            texts = [record["text"] for record in records]
+            if records:
+                vectors = np.array([record["embedding"] for record in records], dtype=np.float32)
+                norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                vectors /= np.maximum(norms, 1e-12)
+            else:
+                vectors = np.empty((0, 0), dtype=np.float32)
+            index = None
+            if faiss is not None and records:
+                index = faiss.IndexFlatIP(vectors.shape[1])
+                index.add(vectors)
+            _chunk_mirror = (ids, texts, vectors, index)
+        return _chunk_mirror
+
+
+def _local_vector_search(driver, query_vector: List[float], top_k: int) -> List[Dict[str, Any]]:
+    """Cosine top-k over the chunk mirror, scored like Neo4j's vector index ((1 + cos) / 2)."""
+    ids, texts, vectors, index = _get_chunk_mirror(driver)
+    if not ids:
+        return []
+    query = np.asarray(query_vector, dtype=np.float32)
+    query /= max(float(np.linalg.norm(query)), 1e-12)
+    k = min(top_k, len(ids))
+    if index is not None:
+        scores, positions = index.search(query[None, :], k)
+        hits = zip(positions[0].tolist(), scores[0].tolist())
+    else:
+        sims = vectors @ query
+        top = np.argpartition(sims, -k)[-k:]
+        top = top[np.argsort(sims[top])[::-1]]
+        hits = ((i, float(sims[i])) for i in top)
+    return [
+        {
+            "content": texts[i],
+            "score": (1.0 + sim) / 2.0,
+            "metadata": {"id": ids[i]}
+        }
+        for i, sim in hits
+    ]
+
+
+@functools.lru_cache(maxsize=256)
+def _property_type(spec_json: str) -> "Optional[PropertyType]":
+    """PropertyType for one property spec (str or dict), given as canonical JSON; None if invalid.
+    
+    Schemas repeat the same small property specs, so instances are shared;
+    treat them as read-only.
+    """
+    p = loads(spec_json)
+    if isinstance(p, dict):
+        try:
+            return PropertyType(**p)
+        except TypeError:
+            # Try common alternate key names
+            if "name" in p:
+                return PropertyType(name=p["name"], **{k: v for k, v in p.items() if k != "name"})
+            elif "key" in p:
+                return PropertyType(name=p["key"], **{k: v for k, v in p.items() if k != "key"})
+            # Skip invalid shapes gracefully
+            return None
+    elif isinstance(p, str):
+        # Best-effort: set name only; library may default type
+        try:
+            return PropertyType(name=p)
+        except TypeError:
+            # Older versions may use 'key' instead of 'name'
+            try:
+                return PropertyType(key=p)
+            except Exception:
+                return None
+    return None
+
+
+def _to_property_types(props: List[Any]) -> "List[PropertyType]":
+    """Convert a list of property specs (str or dict) to PropertyType instances."""
+    property_types = (
+        _property_type(dumps(p, sort_keys=True))
+        for p in props or []
+        if isinstance(p, (str, dict))
+    )
+    return [pt for pt in property_types if pt is not None]
+
+
+# Built schemas keyed by a hash of the canonical (sorted-keys) schema JSON
+SCHEMA_CACHE_SIZE = 32
+_SCHEMA_CACHE: Dict[str, Any] = {}
+# Schema file path -> (mtime_ns, parsed JSON); treat the cached dicts as read-only
+_schema_file_cache: Dict[str, tuple] = {}
+
+
+# schema_config strings longer than this are parsed without being cached, so
+# a pathological argument cannot pin megabytes in the parse cache
+SCHEMA_CONFIG_CACHE_MAX_CHARS = 1_000_000
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_schema_config_cached(schema_config: str) -> Dict[str, Any]:
+    return loads(schema_config)
+
+
+def _parse_schema_config(schema_config: str) -> Dict[str, Any]:
+    """Parse a schema_config argument; agents pass the same string on every call.
+    
+    The returned dict is shared between calls; treat it as read-only.
+    """
+    if len(schema_config) > SCHEMA_CONFIG_CACHE_MAX_CHARS:
+        return loads(schema_config)
+    return _parse_schema_config_cached(schema_config)
+
+
+def _load_schema_file(schema_path: str) -> Dict[str, Any]:
+    """Parse a schema JSON file, re-reading it only when its mtime changes."""
+    mtime_ns = os.stat(schema_path).st_mtime_ns
+    cached = _schema_file_cache.get(schema_path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    with open(schema_path, "rb") as f:
+        schema_dict = loads(f.read())
+    _schema_file_cache[schema_path] = (mtime_ns, schema_dict)
+    return schema_dict
+
+
+async def _build_schema_cached(node_types: List[Any], relationship_types: List[Any], patterns: List[Any]) -> Any:
+    """Build the GraphRAG schema for these specs, reusing the result for identical specs."""
+    canonical = dumps(
+        {"node_types": node_types, "relationship_types": relationship_types, "patterns": patterns},
+        sort_keys=True
+    )
+    key = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    schema = _SCHEMA_CACHE.get(key)
+    if schema is not None:
+        return schema
+    
+    schema_builder = SchemaBuilder()
+    
+    node_type_objects = []
+    for nt in node_types:
+        if isinstance(nt, str):
+            node_type_objects.append(NodeType(label=nt))
+        elif isinstance(nt, dict):
+            props = _to_property_types(nt.get("properties", []))
+            node_type_objects.append(
+                NodeType(
+                    label=nt["label"],
+                    description=nt.get("description"),
+                    properties=props
+                )
+            )
+    
+    rel_type_objects = []
+    for rt in relationship_types:
+        if isinstance(rt, str):
+            rel_type_objects.append(RelationshipType(label=rt))
+        elif isinstance(rt, dict):
+            props = _to_property_types(rt.get("properties", []))
+            rel_type_objects.append(
+                RelationshipType(
+                    label=rt["label"],
+                    description=rt.get("description"),
+                    properties=props
+                )
+            )
+    
+    schema_result = await schema_builder.run(
+        node_types=node_type_objects,
+        relationship_types=rel_type_objects,
+        patterns=patterns if patterns else None
+    )
+    schema_candidate = getattr(schema_result, "graph_schema", None)
+    if schema_candidate is None:
+        attr = getattr(schema_result, "schema", None)
+        schema_candidate = attr if (attr is not None and not callable(attr)) else None
+    schema = schema_candidate or schema_result
+    
+    _SCHEMA_CACHE[key] = schema
+    if len(_SCHEMA_CACHE) > SCHEMA_CACHE_SIZE:
+        _SCHEMA_CACHE.pop(next(iter(_SCHEMA_CACHE)))
+    return schema
 
 
 def kg_updater(
@@ -118,7 +970,8 @@ def kg_updater(
     source_info: Annotated[str, "Information about the source (e.g., document name, URL, timestamp)"],
     schema_config: Annotated[Optional[str], "Optional JSON string defining custom node types, relationship types, and patterns"] = None,
     chunk_size: Annotated[int, "Size of text chunks for processing"] = 4000,
-    chunk_overlap: Annotated[int, "Overlap between consecutive chunks"] = 200
+    chunk_overlap: Annotated[int, "Overlap between consecutive chunks"] = 200,
+    async_mode: Annotated[bool, "Queue the ingest and return a job_id immediately; check it with kg_job_status"] = False
 ) -> str:
     """
     Transform retrieved information into knowledge graph format and store in Neo4j.
@@ -132,13 +985,80 @@ def kg_updater(
     
     The pipeline follows the Neo4j GraphRAG architecture:
     Document → Text Splitter → Chunk Embedder → Entity & Relation Extractor → KG Writer → Neo4j
+    
+    With async_mode the ingest runs on a background worker and the call returns
+    {"status": "queued", "job_id": ...} right away.
     """
+    if async_mode:
+        return dumps(_queue_kg_job(text_content, source_info, schema_config, chunk_size, chunk_overlap))
+    return dumps(_kg_updater_dict(text_content, source_info, schema_config, chunk_size, chunk_overlap))
+
+
+# Background ingestion: one daemon worker runs queued kg_updater jobs in order.
+# _kg_jobs maps job_id -> {"status": queued|running|done, "result": response dict};
+# only the most recent KG_JOB_HISTORY jobs are kept.
+KG_JOB_HISTORY = 1000
+_kg_queue: "queue.Queue[tuple]" = queue.Queue()
+_kg_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_kg_jobs_lock = threading.Lock()
+_kg_worker: Optional[threading.Thread] = None
+
+
+def _kg_worker_loop() -> None:
+    while True:
+        job_id, args = _kg_queue.get()
+        with _kg_jobs_lock:
+            _kg_jobs[job_id]["status"] = "running"
+        result = _kg_updater_dict(*args)
+        with _kg_jobs_lock:
+            _kg_jobs[job_id].update(status="done", result=result)
+        _kg_queue.task_done()
+
+
+def _queue_kg_job(*args) -> Dict[str, Any]:
+    global _kg_worker
+    job_id = uuid.uuid4().hex
+    with _kg_jobs_lock:
+        _kg_jobs[job_id] = {"status": "queued", "result": None}
+        while len(_kg_jobs) > KG_JOB_HISTORY and next(iter(_kg_jobs.values()))["status"] == "done":
+            _kg_jobs.popitem(last=False)
+        if _kg_worker is None:
+            _kg_worker = threading.Thread(target=_kg_worker_loop, name="kg-updater-worker", daemon=True)
+            _kg_worker.start()
+    _kg_queue.put((job_id, args))
+    return {
+        "status": "queued",
+        "message": "Knowledge graph update queued",
+        "job_id": job_id
+    }
+
+
+def kg_job_status(
+    job_id: Annotated[str, "job_id returned by kg_updater(async_mode=True)"]
+) -> str:
+    """Report the state of a queued knowledge graph update, with its result once done."""
+    with _kg_jobs_lock:
+        job = _kg_jobs.get(job_id)
+        job = dict(job) if job is not None else None
+    if job is None:
+        return dumps({"status": "error", "message": f"Unknown job_id: {job_id}"})
+    return dumps({"job_id": job_id, "job_status": job["status"], "result": job["result"]})
+
+
+def _kg_updater_dict(
+    text_content: str,
+    source_info: str,
+    schema_config: Optional[str] = None,
+    chunk_size: int = 4000,
+    chunk_overlap: int = 200
+) -> Dict[str, Any]:
+    """kg_updater returning the response dict instead of a JSON string."""
     try:
         if not GRAPHRAG_AVAILABLE:
-            return json.dumps({
+            return {
                 "status": "error",
                 "message": "neo4j-graphrag package not installed. Install with: pip install neo4j-graphrag"
-            })
+            }
         
         # Initialize Neo4j connection
         driver = get_neo4j_connection()
@@ -150,15 +1070,15 @@ def kg_updater(
         
         if schema_config:
             try:
-                schema_dict = json.loads(schema_config)
+                schema_dict = _parse_schema_config(schema_config)
                 node_types = schema_dict.get("node_types", [])
                 relationship_types = schema_dict.get("relationship_types", [])
                 patterns = schema_dict.get("patterns", [])
-            except json.JSONDecodeError:
-                return json.dumps({
+            except JSONDecodeError:
+                return {
                     "status": "error",
                     "message": "Invalid schema_config JSON format"
-                })
+                }
         else:
             # Fallback: allow prebuilt schema via env var or default path
             schema_path = os.getenv("NEO4J_SCHEMA_PATH")
@@ -168,182 +1088,122 @@ def kg_updater(
                     schema_path = str(default_path)
             if schema_path:
                 try:
-                    with open(schema_path, "r", encoding="utf-8") as f:
-                        schema_dict = json.load(f)
+                    schema_dict = _load_schema_file(schema_path)
                     node_types = schema_dict.get("node_types", [])
                     relationship_types = schema_dict.get("relationship_types", [])
                     patterns = schema_dict.get("patterns", [])
                 except Exception as e:
-                    return json.dumps({
+                    return {
                         "status": "error",
                         "message": f"Failed to read schema file at {schema_path}: {str(e)}"
-                    })
-        
-        # Initialize OpenAI LLM for entity extraction
-        llm = OpenAILLM(
-            model_name="gpt-4o-mini",
-            model_params={
-                "max_tokens": 2000,
-                "response_format": {"type": "json_object"},
-                "temperature": 0
-            }
-        )
+                    }
         
         # Initialize embedder for chunk embeddings
-        embedder = OpenAIEmbeddings(model="text-embedding-3-small")
+        embedder = _get_openai_embedder(EMBEDDING_MODEL, normalize=True)
         
-        # Helper: convert a list of property specs (str or dict) to PropertyType instances
-        def _to_property_types(props: List[Any]) -> List[PropertyType]:
-            property_types: List[PropertyType] = []
-            for p in props or []:
-                if isinstance(p, dict):
-                    try:
-                        property_types.append(PropertyType(**p))
-                    except TypeError:
-                        # Try common alternate key names
-                        if "name" in p:
-                            property_types.append(PropertyType(name=p["name"], **{k: v for k, v in p.items() if k != "name"}))
-                        elif "key" in p:
-                            property_types.append(PropertyType(name=p["key"], **{k: v for k, v in p.items() if k != "key"}))
-                        else:
-                            # Skip invalid shapes gracefully
-                            continue
-                elif isinstance(p, str):
-                    # Best-effort: set name only; library may default type
-                    try:
-                        property_types.append(PropertyType(name=p))
-                    except TypeError:
-                        # Older versions may use 'key' instead of 'name'
-                        try:
-                            property_types.append(PropertyType(key=p))
-                        except Exception:
-                            continue
-            return property_types
-
         # Step 1: Text Splitter
-        splitter = FixedSizeSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
+        splitter = _get_splitter(chunk_size, chunk_overlap)
         
         # Split text into chunks
         async def process_pipeline():
-            # Step 1: Split text into chunks
-            chunks_result = await splitter.run(text=text_content)
-            
-            # Step 2: Chunk Embedder
-            chunk_embedder = TextChunkEmbedder(embedder=embedder)
-            embedded_chunks = await chunk_embedder.run(text_chunks=chunks_result)
-            
-            # CRITICAL FIX: Ensure metadata contains only primitive values (Neo4j rejects nested maps)
-            if hasattr(embedded_chunks, 'chunks') and embedded_chunks.chunks:
-                for i, chunk in enumerate(embedded_chunks.chunks):
-                    if not hasattr(chunk, 'metadata'):
-                        chunk.metadata = {}
-                    elif chunk.metadata is None:
-                        chunk.metadata = {}
-                    
-                    # Remove embedding from metadata if present (it bloats the metadata)
-                    if 'embedding' in chunk.metadata:
-                        del chunk.metadata['embedding']
-                    
-                    # Set flat document metadata. Avoid nested dicts to satisfy Neo4j property constraints
-                    chunk.metadata.update({
+            async def split_step():
+                # Step 1: Split text into chunks
+                chunks_result = await splitter.run(text=text_content)
+                chunks_result.chunks, skipped, hashes = _drop_ingested_chunks(source_info, chunks_result.chunks)
+                
+                # CRITICAL FIX: Ensure metadata contains only primitive values (Neo4j rejects nested maps)
+                if chunks_result.chunks:
+                    # Flat document metadata, shared by every chunk. Avoid nested dicts
+                    # to satisfy Neo4j property constraints
+                    base_meta = {
                         'document_id': source_info,
                         'document_path': source_info,
                         'document_title': source_info,
                         'source': source_info,
-                        'chunk_id': f"{source_info}_chunk_{i}",
-                        'chunk_index': i,
-                    })
-            # Avoid setting nested metadata on the container as well
+                    }
+                    chunk_id_prefix = f"{source_info}_chunk_"
+                    for chunk in chunks_result.chunks:
+                        # Position in the document, stable when earlier chunks were skipped
+                        i = chunk.index
+                        metadata = getattr(chunk, 'metadata', None) or {}
+                        chunk.metadata = metadata | base_meta | {
+                            'chunk_id': chunk_id_prefix + str(i),
+                            'chunk_index': i,
+                        }
+                # Avoid setting nested metadata on the container as well
+                return chunks_result, skipped, hashes
             
-            # Step 3: Schema Builder (if schema provided)
-            schema = None
-            if node_types or relationship_types:
-                schema_builder = SchemaBuilder()
-                
-                node_type_objects = []
-                for nt in node_types:
-                    if isinstance(nt, str):
-                        node_type_objects.append(NodeType(label=nt))
-                    elif isinstance(nt, dict):
-                        props = _to_property_types(nt.get("properties", []))
-                        node_type_objects.append(
-                            NodeType(
-                                label=nt["label"],
-                                description=nt.get("description"),
-                                properties=props
-                            )
-                        )
-                
-                rel_type_objects = []
-                for rt in relationship_types:
-                    if isinstance(rt, str):
-                        rel_type_objects.append(RelationshipType(label=rt))
-                    elif isinstance(rt, dict):
-                        props = _to_property_types(rt.get("properties", []))
-                        rel_type_objects.append(
-                            RelationshipType(
-                                label=rt["label"],
-                                description=rt.get("description"),
-                                properties=props
-                            )
-                        )
-                
-                schema_result = await schema_builder.run(
-                    node_types=node_type_objects,
-                    relationship_types=rel_type_objects,
-                    patterns=patterns if patterns else None
-                )
-                schema_candidate = getattr(schema_result, "graph_schema", None)
-                if schema_candidate is None:
-                    attr = getattr(schema_result, "schema", None)
-                    schema_candidate = attr if (attr is not None and not callable(attr)) else None
-                schema = schema_candidate or schema_result
+            async def schema_step():
+                # Step 2: Schema Builder (if schema provided; built once per distinct schema)
+                if node_types or relationship_types:
+                    return await _build_schema_cached(node_types, relationship_types, patterns)
+                return None
             
-            # Step 4: Entity & Relation Extractor
-            # Try with create_lexical_graph=False first to see if that's causing issues
-            extractor = LLMEntityRelationExtractor(
-                llm=llm,
-                create_lexical_graph=True
+            # Splitting, the schema build and the vector index check (needed for
+            # later retrieval) are independent; run them concurrently
+            (text_chunks, skipped, hashes), schema, _ = await asyncio.gather(
+                split_step(),
+                schema_step(),
+                asyncio.to_thread(_ensure_vector_index, driver),
             )
             
-            # Extract entities and relationships
-            if schema:
-                graph = await extractor.run(chunks=embedded_chunks, schema=schema)
-            else:
-                graph = await extractor.run(chunks=embedded_chunks)
+            if not text_chunks.chunks:
+                # Nothing new in this document
+                return None, 0, skipped
+            
+            # Step 3: Chunk embeddings and Step 4: Entity & Relation Extractor.
+            # Extraction only reads the chunk text, so the one batched embeddings
+            # request runs off the loop while the LLM calls are in flight
+            extractor = _get_extractor()
+            vectors, graph = await asyncio.gather(
+                asyncio.to_thread(embedder.embed_documents, [chunk.text for chunk in text_chunks.chunks]),
+                extractor.run(chunks=text_chunks, schema=schema) if schema else extractor.run(chunks=text_chunks),
+            )
+            
+            # Attach the embeddings to the lexical graph's Chunk nodes; the writer
+            # stores them with setNodeVectorProperty, i.e. as a packed float32
+            # vector rather than a LIST<FLOAT> of 64-bit values. Matched on the
+            # nodes' "index" property: TextChunk.chunk_id (and the node ids built
+            # from it) only exist from neo4j-graphrag 1.4
+            vector_by_index = {
+                chunk.index: vector for chunk, vector in zip(text_chunks.chunks, vectors)
+            }
+            for node in graph.nodes:
+                if node.label == "Chunk" and node.properties.get("index") in vector_by_index:
+                    node.embedding_properties = {
+                        **(node.embedding_properties or {}),
+                        "embedding": vector_by_index[node.properties["index"]],
+                    }
             
-            # Step 5: Ensure vector index exists for later retrieval, then write
-            _ensure_vector_index(driver)
-            writer = Neo4jWriter(driver)
-            write_result = await writer.run(graph)
+            # Step 5: Write the graph
+            write_result = await _get_kg_writer().run(graph)
+            _record_ingested_chunks(source_info, hashes)
             
-            return write_result, len(embedded_chunks.chunks)
+            return write_result, len(text_chunks.chunks), skipped
         
         # Run the async pipeline
-        result, num_chunks = _run_async_safely(process_pipeline())
-        
-        driver.close()
+        result, num_chunks, chunks_skipped = _run_async_safely(process_pipeline())
+        if result is not None:
+            clear_result_cache()
         
-        return json.dumps({
+        return {
             "status": "success",
             "message": f"Successfully processed and stored knowledge graph",
             "details": {
                 "source": source_info,
                 "chunks_processed": num_chunks,
+                "chunks_skipped": chunks_skipped,
                 "entities_extracted": "Stored in Neo4j",
-                "write_status": result.status
+                "write_status": result.status if result is not None else "skipped"
             }
-        })
+        }
         
     except Exception as e:
-        return json.dumps({
+        return {
             "status": "error",
             "message": f"Error in knowledge graph update pipeline: {str(e)}",
             "error_type": type(e).__name__
-        })
+        }
 
 
 def kg_retriever(
@@ -365,34 +1225,60 @@ def kg_retriever(
     The retrieved information includes entities, relationships, and contextual data
     that can be used to answer questions or provide insights.
     """
+    try:
+        return dumps(_kg_retriever_dict(query, retrieval_type, top_k, custom_cypher))
+    except TypeError as e:
+        # Custom Cypher can return values that have no JSON form
+        return dumps({
+            "status": "error",
+            "message": f"Error retrieving from knowledge graph: {str(e)}",
+            "error_type": type(e).__name__
+        })
+
+
+def _kg_retriever_dict(
+    query: str,
+    retrieval_type: str = "vector",
+    top_k: int = 5,
+    custom_cypher: Optional[str] = None
+) -> Dict[str, Any]:
+    """kg_retriever returning the response dict instead of a JSON string."""
     try:
         if not GRAPHRAG_AVAILABLE:
-            return json.dumps({
+            return {
                 "status": "error",
                 "message": "neo4j-graphrag package not installed. Install with: pip install neo4j-graphrag"
-            })
+            }
+        
+        # Custom Cypher may write, so only the read-only vector strategies are cached
+        cache_key = (query, retrieval_type, top_k) if retrieval_type in ("vector", "vector_cypher") else None
+        if cache_key is not None:
+            cached = _cached_result(cache_key)
+            if cached is not None:
+                return cached
         
         # Initialize Neo4j connection
         driver = get_neo4j_connection()
         
         # Initialize embedder for query embedding
-        embedder = OpenAIEmbeddings(model="text-embedding-3-small")
+        embedder = _get_openai_embedder(EMBEDDING_MODEL)
         
         async def retrieve_knowledge():
             results = []
             
-            if retrieval_type == "vector":
-                # Ensure vector index before vector search
-                _ensure_vector_index(driver)
-                # Simple vector similarity search
-                retriever = VectorRetriever(
-                    driver=driver,
-                    index_name="chunk_index",  # Default index name
-                    embedder=embedder
-                )
-                search_results = await retriever.search(
-                    query_text=query,
-                    top_k=top_k
+            if retrieval_type == "vector" and KG_LOCAL_VECTOR_SEARCH:
+                # In-process search over the mirrored chunk embeddings
+                query_vector = await asyncio.to_thread(embedder.embed_query, query)
+                results = await asyncio.to_thread(_local_vector_search, driver, query_vector, top_k)
+                
+            elif retrieval_type == "vector":
+                # Simple vector similarity search. The retrievers' search is
+                # synchronous (embedding request + Bolt query) and awaiting it
+                # directly fails; run it off the shared loop so concurrent tool
+                # calls overlap their I/O
+                retriever = _get_vector_retriever()
+                search_results = await asyncio.to_thread(
+                    retriever.search, query_text=query, top_k=top_k
                 )
                 results = [
                     {
@@ -405,42 +1291,21 @@ def kg_retriever(
                 
             elif retrieval_type == "vector_cypher":
                 # Hybrid: Vector search + Graph traversal
-                # Custom retrieval query that combines embeddings with graph structure
-                retrieval_query = """
-                MATCH (node)-[:PART_OF_CHUNK]->(chunk:Chunk)
-                MATCH (chunk)-[:PART_OF_DOCUMENT]->(doc:Document)
-                RETURN node.id AS entity_id, 
-                       labels(node) AS entity_labels,
-                       node AS entity_properties,
-                       chunk.text AS context,
-                       doc.path AS source,
-                       score
-                ORDER BY score DESC
-                LIMIT $top_k
-                """
-                
-                # Ensure vector index before vector search
-                _ensure_vector_index(driver)
-                retriever = VectorCypherRetriever(
-                    driver=driver,
-                    index_name="chunk_index",
-                    embedder=embedder,
-                    retrieval_query=retrieval_query
-                )
-                search_results = await retriever.search(
-                    query_text=query,
-                    top_k=top_k
+                retriever = _get_vector_retriever(RETRIEVAL_QUERY)
+                search_results = await asyncio.to_thread(
+                    retriever.search, query_text=query, top_k=top_k
                 )
+                rows = (item.metadata for item in search_results.items)
                 results = [
                     {
-                        "entity_id": item.get("entity_id"),
-                        "entity_labels": item.get("entity_labels"),
-                        "entity_properties": dict(item.get("entity_properties", {})),
-                        "context": item.get("context"),
-                        "source": item.get("source"),
-                        "score": item.get("score")
+                        "entity_id": row.get("entity_id"),
+                        "entity_labels": row.get("entity_labels"),
+                        "entity_properties": row.get("entity_properties") or {},
+                        "context": row.get("context"),
+                        "source": row.get("source"),
+                        "score": row.get("score")
                     }
-                    for item in search_results.items
+                    for row in rows
                 ]
                 
             elif retrieval_type == "cypher":
@@ -451,9 +1316,20 @@ def kg_retriever(
                         "message": "custom_cypher parameter required when retrieval_type='cypher'"
                     }
                 
-                with driver.session() as session:
-                    result = session.run(custom_cypher, {"query": query, "top_k": top_k})
-                    results = [dict(record) for record in result]
+                # execute_query runs in a driver-managed transaction on a pooled
+                # connection; the transformer pulls records lazily and stops after
+                # top_k. Default (writer) routing, since custom_cypher may write.
+                def first_rows(result):
+                    return [record.data() for record in itertools.islice(result, top_k)]
+                
+                # The sync driver blocks; keep it off the shared loop
+                results = await asyncio.to_thread(
+                    driver.execute_query,
+                    custom_cypher,
+                    {"query": query, "top_k": top_k},
+                    database_=NEO4J_DATABASE,
+                    result_transformer_=first_rows,
+                )
             
             else:
                 return {
@@ -466,25 +1342,52 @@ def kg_retriever(
         # Run async retrieval
         retrieved_data = _run_async_safely(retrieve_knowledge())
         
-        driver.close()
-        
         if isinstance(retrieved_data, dict) and retrieved_data.get("status") == "error":
-            return json.dumps(retrieved_data)
+            return retrieved_data
         
-        return json.dumps({
+        response = {
             "status": "success",
             "message": f"Retrieved {len(retrieved_data)} results from knowledge graph",
             "query": query,
             "retrieval_type": retrieval_type,
             "results": retrieved_data
-        })
+        }
+        if cache_key is not None:
+            _cache_result(cache_key, response)
+        return response
         
     except Exception as e:
-        return json.dumps({
+        return {
             "status": "error",
             "message": f"Error retrieving from knowledge graph: {str(e)}",
             "error_type": type(e).__name__
-        })
+        }
+
+
+def _dict_to_document(item: Dict[str, Any]) -> "Document":
+    content = item.get("content")
+    if not isinstance(content, str):
+        raise ValueError("Each dict doc must include string 'content'")
+    return Document(
+        id=item.get("id"),
+        content=content,
+        meta=item.get("meta") or {},
+        embedding=item.get("embedding")
+    )
+
+
+# Document constructors by JSON item type: plain strings are content
+_DOC_HANDLERS = {
+    str: lambda item: Document(content=item),
+    dict: _dict_to_document,
+}
+
+
+def _to_document(item: Any) -> "Document":
+    handler = _DOC_HANDLERS.get(type(item))
+    if handler is None:
+        raise ValueError("Unsupported document item type")
+    return handler(item)
 
 
 def hs_neo4j_upsert_documents(
@@ -493,7 +1396,9 @@ def hs_neo4j_upsert_documents(
     index: Annotated[Optional[str], "Neo4j vector index name"] = None,
     node_label: Annotated[str, "Neo4j node label for documents"] = "Document",
     embedding_field: Annotated[str, "Property name for embeddings"] = "embedding",
-    database: Annotated[str, "Neo4j database name"] = "neo4j"
+    database: Annotated[str, "Neo4j database name"] = "neo4j",
+    batch_size: Annotated[int, "Documents per SentenceTransformers encoding batch"] = ST_BATCH_SIZE,
+    backend: Annotated[str, "SentenceTransformers backend: 'onnx' (int8, falls back to torch) or 'torch'"] = ST_BACKEND
 ) -> str:
     """
     Upsert documents into Neo4j via Haystack's Neo4jDocumentStore.
@@ -502,73 +1407,49 @@ def hs_neo4j_upsert_documents(
       - an array of Haystack Document-like dicts: {content, id?, meta?, embedding?}
     """
     try:
-        if not HAYSTACK_NEO4J_AVAILABLE:
-            return json.dumps({
+        if not _haystack_available():
+            return dumps({
                 "status": "error",
                 "message": "Haystack Neo4j integration not available. Install haystack-ai and neo4j-haystack."
             })
 
-        data = json.loads(documents)
+        data = loads(documents)
         if not isinstance(data, list):
-            return json.dumps({"status": "error", "message": "documents must be a JSON array"})
+            return dumps({"status": "error", "message": "documents must be a JSON array"})
 
         # Prepare Haystack Documents
-        hs_docs: List[Document] = []
-        for item in data:
-            if isinstance(item, str):
-                hs_docs.append(Document(content=item))
-            elif isinstance(item, dict):
-                content = item.get("content")
-                if not isinstance(content, str):
-                    return json.dumps({"status": "error", "message": "Each dict doc must include string 'content'"})
-                hs_docs.append(Document(
-                    id=item.get("id"),
-                    content=content,
-                    meta=item.get("meta") or {},
-                    embedding=item.get("embedding")
-                ))
-            else:
-                return json.dumps({"status": "error", "message": "Unsupported document item type"})
-
-        # Embed if no embeddings provided
-        need_embedding = any(d.embedding is None for d in hs_docs)
-        if need_embedding:
-            embedder = SentenceTransformersDocumentEmbedder(model=embedding_model)
-            embedder.warm_up()
-            result = embedder.run(documents=hs_docs)
-            hs_docs = result["documents"]  # enriched with embeddings
+        try:
+            hs_docs: List[Document] = [_to_document(item) for item in data]
+        except ValueError as e:
+            return dumps({"status": "error", "message": str(e)})
 
-        # Connect to Neo4j and write
-        uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-        username = os.getenv("NEO4J_USERNAME", "neo4j")
-        password = os.getenv("NEO4J_PASSWORD", "passw0rd")
+        # Embed only the documents that came without an embedding; the embedder
+        # would otherwise re-encode (and overwrite) the provided ones
+        pending = [d for d in hs_docs if d.embedding is None]
+        if pending:
+            embedder = _get_st_embedder(embedding_model, batch_size, backend)
+            embedded = iter(embedder.run(documents=pending)["documents"])
+            hs_docs = [next(embedded) if d.embedding is None else d for d in hs_docs]
 
         # Infer embedding dim from first document
         first_emb = next((d.embedding for d in hs_docs if d.embedding is not None), None)
         if first_emb is None:
-            return json.dumps({"status": "error", "message": "No embeddings available after embedding step"})
+            return dumps({"status": "error", "message": "No embeddings available after embedding step"})
         embedding_dim = len(first_emb)
 
-        doc_store = Neo4jDocumentStore(
-            url=uri,
-            username=username,
-            password=password,
-            database=database,
-            embedding_dim=embedding_dim,
-            embedding_field=embedding_field,
-            index=index or "document_embeddings",
-            node_label=node_label,
+        doc_store = _get_document_store(
+            database, embedding_dim, embedding_field, index or "document_embeddings", node_label
         )
 
         doc_store.write_documents(hs_docs)
 
-        return json.dumps({
+        return dumps({
             "status": "success",
             "message": f"Upserted {len(hs_docs)} documents into Neo4j via Haystack",
             "details": {"index": index or "document_embeddings", "node_label": node_label}
         })
     except Exception as e:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": f"Haystack Neo4j upsert failed: {str(e)}",
             "error_type": type(e).__name__
@@ -582,44 +1463,33 @@ def hs_neo4j_retrieve(
     index: Annotated[Optional[str], "Neo4j vector index name"] = None,
     node_label: Annotated[str, "Neo4j node label for documents"] = "Document",
     embedding_field: Annotated[str, "Property name for embeddings"] = "embedding",
-    database: Annotated[str, "Neo4j database name"] = "neo4j"
+    database: Annotated[str, "Neo4j database name"] = "neo4j",
+    backend: Annotated[str, "SentenceTransformers backend; use the one the documents were upserted with"] = ST_BACKEND
 ) -> str:
     """
     Retrieve documents from Neo4j via Haystack's Neo4jEmbeddingRetriever.
     """
     try:
-        if not HAYSTACK_NEO4J_AVAILABLE:
-            return json.dumps({
+        if not _haystack_available():
+            return dumps({
                 "status": "error",
                 "message": "Haystack Neo4j integration not available. Install haystack-ai and neo4j-haystack."
             })
 
-        uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-        username = os.getenv("NEO4J_USERNAME", "neo4j")
-        password = os.getenv("NEO4J_PASSWORD", "passw0rd")
-
-        # Build a document store aligned with how data was inserted
-        # We need embedding dim to init the store; use the embedder to get it
-        embedder = SentenceTransformersDocumentEmbedder(model=embedding_model)
-        embedder.warm_up()
-        emb_dim = embedder.embedding_dimension if hasattr(embedder, "embedding_dimension") else 384
+        # The retriever searches by vector; embed the query (memoized per model + text)
+        query_embedding = _embed_st_query(embedding_model, query, backend)
 
-        document_store = Neo4jDocumentStore(
-            url=uri,
-            username=username,
-            password=password,
-            database=database,
-            embedding_dim=emb_dim,
-            embedding_field=embedding_field,
-            index=index or "document_embeddings",
-            node_label=node_label,
+        # Build a document store aligned with how data was inserted; the query
+        # embedding gives the embedding dim it needs
+        document_store = _get_document_store(
+            database, len(query_embedding), embedding_field, index or "document_embeddings", node_label
         )
 
         retriever = Neo4jEmbeddingRetriever(document_store=document_store, top_k=top_k)
-        result = retriever.run(query=query)
+        result = retriever.run(query_embedding=list(query_embedding))
         docs: List[Document] = result.get("documents", [])
 
-        return json.dumps({
+        return dumps({
             "status": "success",
             "message": f"Retrieved {len(docs)} documents via Haystack Neo4j",
             "results": [
@@ -633,7 +1503,7 @@ def hs_neo4j_retrieve(
             ]
         })
     except Exception as e:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": f"Haystack Neo4j retrieval failed: {str(e)}",
             "error_type": type(e).__name__
@@ -7,16 +7,25 @@ import os
 from typing import Annotated
 from pathlib import Path
 
+from ._fs import atomic_write_bytes
+
+# Set FSYNC_WRITES=1 to flush written files to disk before they replace the target
+FSYNC_WRITES = os.getenv("FSYNC_WRITES") == "1"
+
 
 def read_file(file_path: Annotated[str, "Path to the file to read"]) -> str:
     """Read the contents of a file."""
     try:
-        path = Path(file_path)
-        if not path.exists():
+        # One read of the raw bytes and one decode, instead of the text layer's
+        # chunked incremental decoding; a missing file fails here without a stat
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read().decode('utf-8')
+        except FileNotFoundError:
             return f"Error: File '{file_path}' does not exist."
-        
-        with open(path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Same universal-newline translation as text mode
+        if '\r' in content:
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
         
         return f"Content of {file_path}:\n```\n{content}\n```"
     except Exception as e:
@@ -26,15 +35,17 @@ def read_file(file_path: Annotated[str, "Path to the file to read"]) -> str:
 def list_directory(dir_path: Annotated[str, "Path to the directory to list"] = ".") -> str:
     """List all files and directories in the specified path."""
     try:
-        path = Path(dir_path)
-        if not path.exists():
+        # scandir reports entry types from the directory listing itself, so
+        # only symlinks need a stat (to report what they point to)
+        try:
+            with os.scandir(dir_path) as entries:
+                items = [
+                    f"  [{'DIR' if entry.is_dir() else 'FILE'}] {entry.name}"
+                    for entry in entries
+                ]
+        except FileNotFoundError:
             return f"Error: Directory '{dir_path}' does not exist."
         
-        items = []
-        for item in path.iterdir():
-            item_type = "DIR" if item.is_dir() else "FILE"
-            items.append(f"  [{item_type}] {item.name}")
-        
         return f"Contents of {dir_path}:\n" + "\n".join(sorted(items))
     except Exception as e:
         return f"Error listing directory '{dir_path}': {str(e)}"
@@ -49,8 +60,11 @@ def write_file(
         path = Path(file_path)
         path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Write a sibling temp file and rename it over the target, so readers
+        # never see a partially written file; newlines as text mode writes them
+        if os.linesep != '\n':
+            content = content.replace('\n', os.linesep)
+        atomic_write_bytes(path, content.encode('utf-8'), fsync=FSYNC_WRITES)
         
         return f"Successfully wrote to {file_path}"
     except Exception as e:
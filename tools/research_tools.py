@@ -2,9 +2,97 @@
 Research tools for web search and information gathering.
 """
 
-from typing import Annotated
+from typing import Annotated, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+import functools
+import logging
 import os
-import json
+import threading
+import time
+
+from ._fs import atomic_write_bytes
+from ._json import JSONDecodeError, dumps, dumps_bytes, loads
+
+logger = logging.getLogger(__name__)
+
+
+# Successful web_search responses by exact query, kept across restarts in the
+# agent workspace. Entries expire after WEB_SEARCH_CACHE_TTL seconds (default
+# one day; 0 disables the cache).
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", "86400"))
+WEB_SEARCH_CACHE_SIZE = 256
+_SEARCH_CACHE_FILE = Path(".agent_workspace") / "_search_cache.json"
+_search_cache: Optional[OrderedDict] = None  # query -> (expires_at, response JSON)
+_search_cache_lock = threading.Lock()
+
+
+def _load_search_cache() -> OrderedDict:
+    """The in-memory cache, read from the workspace file on first use (lock held)."""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = OrderedDict()
+        try:
+            entries = loads(_SEARCH_CACHE_FILE.read_bytes())
+            now = time.time()
+            for query, expires_at, response in entries:
+                if expires_at > now:
+                    _search_cache[query] = (expires_at, response)
+        except (OSError, ValueError, TypeError):
+            # Missing or unreadable file: start empty
+            pass
+    return _search_cache
+
+
+def _cached_search(query: str) -> Optional[str]:
+    if WEB_SEARCH_CACHE_TTL <= 0:
+        return None
+    with _search_cache_lock:
+        cache = _load_search_cache()
+        entry = cache.get(query)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del cache[query]
+            return None
+        cache.move_to_end(query)
+        return entry[1]
+
+
+def _cache_search(query: str, response: str) -> str:
+    """Remember a successful response and persist the cache; returns response."""
+    if WEB_SEARCH_CACHE_TTL <= 0:
+        return response
+    with _search_cache_lock:
+        cache = _load_search_cache()
+        cache[query] = (time.time() + WEB_SEARCH_CACHE_TTL, response)
+        cache.move_to_end(query)
+        while len(cache) > WEB_SEARCH_CACHE_SIZE:
+            cache.popitem(last=False)
+        try:
+            _SEARCH_CACHE_FILE.parent.mkdir(exist_ok=True)
+            atomic_write_bytes(_SEARCH_CACHE_FILE, dumps_bytes([[q, *entry] for q, entry in cache.items()]))
+        except OSError:
+            # The in-memory cache still serves this process
+            pass
+    return response
+
+
+@functools.lru_cache(maxsize=1)
+def _get_searcher():
+    """Shared SerperDevWebSearch instance, or None if haystack-ai is not installed.
+    
+    The import and construction happen once per process; a failed import is
+    remembered too, so it is not retried on every call.
+    """
+    try:
+        from haystack.components.websearch import SerperDevWebSearch
+    except ImportError:
+        return None
+    # It reads the API key from the environment automatically
+    return SerperDevWebSearch(top_k=5)
 
 
 def web_search(query: Annotated[str, "The search query to look up on the web"]) -> str:
@@ -16,82 +104,193 @@ def web_search(query: Annotated[str, "The search query to look up on the web"])
         # Check if API key is set
         api_key = os.getenv("SERPERDEV_API_KEY")
         if not api_key:
-            return json.dumps({
+            return dumps({
                 "status": "error",
                 "message": "SERPERDEV_API_KEY not set. Please configure your SerperDev API key in .env file.",
                 "suggestion": "Get a free API key at https://serper.dev and add to .env: SERPERDEV_API_KEY=your_key"
             })
         
+        cached = _cached_search(query)
+        if cached is not None:
+            return cached
+        
         # Try to use SerperDev if available
-        try:
-            from haystack.components.websearch import SerperDevWebSearch
-            
-            # Create searcher (it reads API key from environment automatically)
-            searcher = SerperDevWebSearch(top_k=5)
-            
-            # Perform search (no warm_up needed for SerperDevWebSearch)
-            result = searcher.run(query=query)
-            
-            # Extract and format results
-            documents = result.get("documents", [])
-            links = result.get("links", [])
-            
-            if not documents:
-                return json.dumps({
-                    "status": "success",
-                    "message": f"No results found for: {query}",
-                    "results": []
-                })
-            
-            # Format results
-            formatted_results = []
-            for doc in documents:
-                formatted_results.append({
-                    "title": doc.meta.get("title", "No title"),
-                    "link": doc.meta.get("link", "No link"),
-                    "snippet": doc.content[:300] if doc.content else "No content available"
-                })
-            
-            return json.dumps({
-                "status": "success",
-                "query": query,
-                "result_count": len(formatted_results),
-                "results": formatted_results,
-                "all_links": links[:10]
-            }, indent=2)
-            
-        except ImportError:
+        searcher = _get_searcher()
+        if searcher is None:
             # Fallback: Return mock results or error
-            return json.dumps({
+            return dumps({
                 "status": "error",
                 "message": "SerperDev integration not installed. Install with: pip install haystack-ai",
                 "suggestion": "The SerperDev component is part of haystack-ai package"
             })
+        
+        # Perform search (no warm_up needed for SerperDevWebSearch)
+        result = searcher.run(query=query)
+        
+        # Extract and format results
+        documents = result.get("documents", [])
+        links = result.get("links", [])
+        
+        if not documents:
+            return _cache_search(query, dumps({
+                "status": "success",
+                "message": f"No results found for: {query}",
+                "results": []
+            }))
+        
+        # Format results
+        formatted_results = [
+            {
+                "title": doc.meta.get("title", "No title"),
+                "link": doc.meta.get("link", "No link"),
+                "snippet": doc.content[:300] if doc.content else "No content available"
+            }
+            for doc in documents
+        ]
+        
+        return _cache_search(query, dumps({
+            "status": "success",
+            "query": query,
+            "result_count": len(formatted_results),
+            "results": formatted_results,
+            "all_links": links[:10]
+        }))
     
     except Exception as e:
-        import traceback
-        return json.dumps({
+        # The traceback goes to the log, not into the agent's context
+        logger.exception("web_search failed")
+        return dumps({
             "status": "error",
             "message": f"Error performing web search: {str(e)}",
-            "traceback": traceback.format_exc()
+            "error_type": type(e).__name__
+        })
+
+
+# Concurrent searches per web_search_batch call; each search is one blocking
+# HTTP request, so threads overlap the round trips
+WEB_SEARCH_PARALLEL = int(os.getenv("WEB_SEARCH_PARALLEL", "8"))
+_search_pool: Optional[ThreadPoolExecutor] = None
+_search_pool_lock = threading.Lock()
+
+
+def _get_search_pool() -> ThreadPoolExecutor:
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is None:
+            _search_pool = ThreadPoolExecutor(
+                max_workers=WEB_SEARCH_PARALLEL, thread_name_prefix="web-search"
+            )
+        return _search_pool
+
+
+def web_search_batch(
+    queries: Annotated[str, "JSON array string of search queries to run concurrently, e.g. '[\"python asyncio\", \"fastapi sse\"]'"]
+) -> str:
+    """
+    Run several web searches at once.
+    Returns one web_search result per query, in the same order.
+    """
+    try:
+        try:
+            queries = loads(queries)
+        except JSONDecodeError as e:
+            return dumps({
+                "status": "error",
+                "message": f"Invalid JSON format for queries: {str(e)}"
+            })
+        
+        if not queries or not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+            return dumps({
+                "status": "error",
+                "message": "queries must be a non-empty JSON array of search strings"
+            })
+        
+        # Duplicate queries are searched once
+        unique = list(dict.fromkeys(queries))
+        responses = dict(zip(unique, _get_search_pool().map(web_search, unique)))
+        
+        return dumps({
+            "status": "success",
+            "query_count": len(queries),
+            "results": [
+                {"query": query, **loads(responses[query])}
+                for query in queries
+            ]
+        })
+    
+    except Exception as e:
+        return dumps({
+            "status": "error",
+            "message": f"Error performing batch web search: {str(e)}"
         })
 
 
+_WIKI_API = "https://en.wikipedia.org/w/api.php"
+_WIKI_SUMMARY = "https://en.wikipedia.org/api/rest_v1/page/summary/"
+
+
+@functools.lru_cache(maxsize=1)
+def _get_wiki_session():
+    """Shared HTTP session for Wikipedia; keeps connections (and TLS) alive across calls."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=10))
+    # Wikimedia asks API clients to identify themselves
+    session.headers["User-Agent"] = "multiagent-orchestration-system research tool"
+    return session
+
+
+@functools.lru_cache(maxsize=256)
+def _wikipedia_summary(query: str) -> str:
+    """Response JSON for the article best matching query; errors propagate (and are not cached)."""
+    session = _get_wiki_session()
+    
+    # Resolve the query to an article title
+    found = session.get(
+        _WIKI_API,
+        params={"action": "opensearch", "search": query, "limit": 1, "namespace": 0, "format": "json"},
+        timeout=5
+    )
+    found.raise_for_status()
+    titles = loads(found.content)[1]
+    if not titles:
+        return dumps({
+            "status": "success",
+            "message": f"No Wikipedia article found for: {query}",
+            "results": []
+        })
+    
+    # The REST summary is a compact JSON document: title, plain-text extract, URL
+    summary = session.get(_WIKI_SUMMARY + quote(titles[0].replace(" ", "_"), safe=""), timeout=5)
+    summary.raise_for_status()
+    page = loads(summary.content)
+    return dumps({
+        "status": "success",
+        "query": query,
+        "title": page.get("title", titles[0]),
+        "description": page.get("description", ""),
+        "summary": page.get("extract", ""),
+        "link": page.get("content_urls", {}).get("desktop", {}).get("page", "")
+    })
+
+
 def search_wikipedia(query: Annotated[str, "The query to search on Wikipedia"]) -> str:
     """
     Search Wikipedia for information.
     Returns article summaries and links.
     """
     try:
-        # Simple implementation - in production you'd use Wikipedia API
-        return json.dumps({
-            "status": "info",
-            "message": "Wikipedia search not yet implemented. Use web_search with 'site:wikipedia.org' in your query.",
+        return _wikipedia_summary(query)
+    except ImportError:
+        return dumps({
+            "status": "error",
+            "message": "Wikipedia search needs the requests package. Install with: pip install requests",
             "suggestion": f"Try: web_search('site:wikipedia.org {query}')"
         })
     except Exception as e:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": f"Error searching Wikipedia: {str(e)}"
         })
-
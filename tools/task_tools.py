@@ -3,10 +3,15 @@ Task management tools for the orchestrator.
 Contains functions for creating and managing task lists.
 """
 
-import json
-from typing import Annotated, List
+from typing import Annotated
 from pathlib import Path
 
+from ._fs import atomic_write_bytes
+from ._json import JSONDecodeError, dumps, dumps_bytes, loads
+
+
+_ALLOWED_STATUSES = frozenset({"pending", "in_progress", "completed"})
+
 
 def create_task_list(
     tasks: Annotated[str, "JSON array string of task objects with 'description' field, e.g. '[{\"description\": \"Implement calculator\"}, {\"description\": \"Write tests\"}]'"]
@@ -20,36 +25,39 @@ def create_task_list(
     """
     try:
         # Parse the tasks JSON string
-        task_list = json.loads(tasks)
+        task_list = loads(tasks)
         
         if not isinstance(task_list, list):
-            return json.dumps({
+            return dumps({
                 "status": "error",
                 "message": "Tasks must be a JSON array of task objects"
             })
         
-        # Validate and format tasks
-        formatted_tasks = []
-        for i, task in enumerate(task_list):
-            if isinstance(task, dict) and "description" in task:
-                formatted_tasks.append({
-                    "description": task["description"],
-                    "status": "pending"
-                })
-            elif isinstance(task, str):
-                # Allow simple string tasks
-                formatted_tasks.append({
-                    "description": task,
-                    "status": "pending"
-                })
-            else:
-                return json.dumps({
-                    "status": "error",
-                    "message": f"Task {i} must have a 'description' field or be a string"
-                })
+        # Validate: each task is a string or a dict with a 'description'
+        bad_index = next(
+            (
+                i for i, task in enumerate(task_list)
+                if not (isinstance(task, str) or (isinstance(task, dict) and "description" in task))
+            ),
+            None
+        )
+        if bad_index is not None:
+            return dumps({
+                "status": "error",
+                "message": f"Task {bad_index} must have a 'description' field or be a string"
+            })
+        
+        # Format tasks; simple string tasks are their own description
+        formatted_tasks = [
+            {
+                "description": task if isinstance(task, str) else task["description"],
+                "status": "pending"
+            }
+            for task in task_list
+        ]
         
         if not formatted_tasks:
-            return json.dumps({
+            return dumps({
                 "status": "error",
                 "message": "Task list cannot be empty"
             })
@@ -59,23 +67,22 @@ def create_task_list(
         workspace.mkdir(exist_ok=True)
         
         tasks_file = workspace / "_active_tasks.json"
-        with open(tasks_file, 'w', encoding='utf-8') as f:
-            json.dump(formatted_tasks, f, indent=2)
+        atomic_write_bytes(tasks_file, dumps_bytes(formatted_tasks, indent=True))
         
-        return json.dumps({
+        return dumps({
             "status": "success",
             "message": f"Created task list with {len(formatted_tasks)} tasks",
             "tasks": formatted_tasks,
             "task_count": len(formatted_tasks)
         })
         
-    except json.JSONDecodeError as e:
-        return json.dumps({
+    except JSONDecodeError as e:
+        return dumps({
             "status": "error",
             "message": f"Invalid JSON format for tasks: {str(e)}"
         })
     except Exception as e:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": f"Error creating task list: {str(e)}"
         })
@@ -94,23 +101,22 @@ def update_task_status(
         tasks_file = workspace / "_active_tasks.json"
         
         if not tasks_file.exists():
-            return json.dumps({
+            return dumps({
                 "status": "error",
                 "message": "No active task list found. Create one first with create_task_list."
             })
         
         # Read current tasks
-        with open(tasks_file, 'r', encoding='utf-8') as f:
-            tasks = json.load(f)
+        tasks = loads(tasks_file.read_bytes())
         
         if task_index < 0 or task_index >= len(tasks):
-            return json.dumps({
+            return dumps({
                 "status": "error",
                 "message": f"Task index {task_index} out of range (0-{len(tasks)-1})"
             })
         
-        if status not in ["pending", "in_progress", "completed"]:
-            return json.dumps({
+        if status not in _ALLOWED_STATUSES:
+            return dumps({
                 "status": "error",
                 "message": "Status must be 'pending', 'in_progress', or 'completed'"
             })
@@ -119,18 +125,82 @@ def update_task_status(
         tasks[task_index]["status"] = status
         
         # Save updated tasks
-        with open(tasks_file, 'w', encoding='utf-8') as f:
-            json.dump(tasks, f, indent=2)
+        atomic_write_bytes(tasks_file, dumps_bytes(tasks, indent=True))
         
-        return json.dumps({
+        return dumps({
             "status": "success",
             "message": f"Updated task {task_index} to '{status}'",
             "task": tasks[task_index]
         })
         
     except Exception as e:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": f"Error updating task status: {str(e)}"
         })
 
+
+def update_task_statuses(
+    updates: Annotated[str, "JSON array string of status updates, each an object with task_index (0-based) and status ('pending', 'in_progress', or 'completed'), e.g. '[{\"task_index\": 0, \"status\": \"completed\"}, {\"task_index\": 1, \"status\": \"in_progress\"}]'"]
+) -> str:
+    """
+    Update the status of several tasks at once, e.g. completing one task and
+    starting the next. Either all updates are applied or none.
+    """
+    try:
+        try:
+            updates = loads(updates)
+        except JSONDecodeError as e:
+            return dumps({
+                "status": "error",
+                "message": f"Invalid JSON format for updates: {str(e)}"
+            })
+        
+        if not isinstance(updates, list) or not all(isinstance(update, dict) for update in updates):
+            return dumps({
+                "status": "error",
+                "message": "Updates must be a JSON array of objects with task_index and status"
+            })
+        
+        workspace = Path(".agent_workspace")
+        tasks_file = workspace / "_active_tasks.json"
+        
+        if not tasks_file.exists():
+            return dumps({
+                "status": "error",
+                "message": "No active task list found. Create one first with create_task_list."
+            })
+        
+        tasks = loads(tasks_file.read_bytes())
+        
+        # Validate every update before changing anything
+        for update in updates:
+            task_index = update.get("task_index")
+            if not isinstance(task_index, int) or task_index < 0 or task_index >= len(tasks):
+                return dumps({
+                    "status": "error",
+                    "message": f"Task index {task_index} out of range (0-{len(tasks)-1})"
+                })
+            if update.get("status") not in _ALLOWED_STATUSES:
+                return dumps({
+                    "status": "error",
+                    "message": "Status must be 'pending', 'in_progress', or 'completed'"
+                })
+        
+        for update in updates:
+            tasks[update["task_index"]]["status"] = update["status"]
+        
+        # One write for the whole batch
+        atomic_write_bytes(tasks_file, dumps_bytes(tasks, indent=True))
+        
+        return dumps({
+            "status": "success",
+            "message": f"Applied {len(updates)} task status updates",
+            "tasks": tasks
+        })
+        
+    except Exception as e:
+        return dumps({
+            "status": "error",
+            "message": f"Error updating task statuses: {str(e)}"
+        })
@@ -3,102 +3,228 @@ Testing tools for the coding assistant system.
 Contains functions for writing and running unit tests.
 """
 
-import json
+import ast
 import subprocess
 import sys
 import os
-from typing import Annotated, List
+from typing import Annotated, Dict, List, Optional, Tuple
+import functools
+import importlib.metadata
+import importlib.util
 from pathlib import Path
 
+from ._json import dumps
+
+
+_VENV_PATH = Path(".agent_workspace") / "test_venv"
+# Interpreter of the test venv once found; cleared when the venv is recreated
+_venv_python: Optional[str] = None
+
+
+def _venv_executables(venv_path: Path) -> Tuple[Path, Path]:
+    """(python, pip) paths inside a virtual environment for this platform."""
+    if sys.platform == "win32":
+        return venv_path / "Scripts" / "python.exe", venv_path / "Scripts" / "pip.exe"
+    return venv_path / "bin" / "python", venv_path / "bin" / "pip"
+
+
+# Bytes of each test runner stream (stdout, stderr) returned to the agent
+TEST_OUTPUT_LIMIT = 64 * 1024
+
+
+def _clip_output(data: bytes) -> Tuple[str, bool]:
+    """Decode at most TEST_OUTPUT_LIMIT bytes of a stream; returns (text, truncated).
+    
+    Long output keeps its head and, mostly, its tail, where the failure
+    details and the runners' summaries are printed.
+    """
+    if len(data) <= TEST_OUTPUT_LIMIT:
+        return data.decode("utf-8", "replace"), False
+    head = TEST_OUTPUT_LIMIT // 4
+    tail = TEST_OUTPUT_LIMIT - head
+    skipped = len(data) - head - tail
+    return (
+        data[:head].decode("utf-8", "replace")
+        + f"\n... [{skipped} bytes truncated] ...\n"
+        + data[-tail:].decode("utf-8", "replace")
+    ), True
+
+# Whether pytest is importable, per interpreter path; cleared after installs
+# and whenever the test venv is created or removed
+_has_pytest: Dict[str, bool] = {}
+
+
+def _pytest_available(python_exe: str) -> bool:
+    """Probe (once per interpreter) whether python_exe can import pytest."""
+    found = _has_pytest.get(python_exe)
+    if found is None:
+        if python_exe == sys.executable:
+            found = importlib.util.find_spec("pytest") is not None
+        else:
+            probe = subprocess.run(
+                [python_exe, "-c", "import pytest"],
+                capture_output=True,
+                timeout=30
+            )
+            found = probe.returncode == 0
+        _has_pytest[python_exe] = found
+    return found
+
+
+def _pip_env(workspace_path: Path) -> dict:
+    """Environment for pip runs: a wheel cache kept in the workspace across runs,
+    and no PyPI round trip for pip's own version check."""
+    return {
+        **os.environ,
+        "PIP_CACHE_DIR": str((workspace_path / "_pip_cache").resolve()),
+        "PIP_DISABLE_PIP_VERSION_CHECK": "1",
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _host_pip_supports_python_option() -> bool:
+    """Whether this interpreter's pip can install into another environment (pip >= 22.3)."""
+    try:
+        major, minor = (int(part) for part in importlib.metadata.version("pip").split(".")[:2])
+    except Exception:
+        return False
+    return (major, minor) >= (22, 3)
+
+
+def _pip_command(python_exe: Path, pip_exe: Path) -> List[str]:
+    """Command prefix that runs pip for the test venv.
+    
+    The venv is created without pip; the host's pip installs into it through
+    --python, and pip is only bootstrapped into the venv when that is not possible.
+    """
+    if pip_exe.exists():
+        return [str(pip_exe)]
+    if _host_pip_supports_python_option():
+        return [sys.executable, "-m", "pip", "--python", str(python_exe)]
+    subprocess.run(
+        [str(python_exe), "-m", "ensurepip", "--default-pip"],
+        capture_output=True,
+        timeout=120,
+        check=True
+    )
+    return [str(pip_exe)]
+
+
+def _resolve_venv_python() -> Optional[str]:
+    """The test venv's interpreter, or None if there is no usable venv."""
+    global _venv_python
+    if _venv_python is not None and os.path.exists(_venv_python):
+        return _venv_python
+    if _venv_python is not None:
+        # The venv was removed (e.g. by a workspace reset); forget its probe
+        _has_pytest.pop(_venv_python, None)
+    python_exe = _venv_executables(_VENV_PATH)[0]
+    _venv_python = str(python_exe) if python_exe.exists() else None
+    return _venv_python
+
 
 def setup_test_environment(
     required_packages: Annotated[List[str], "List of Python packages needed for testing (e.g., ['numpy', 'requests==2.28.0'])"] = None
 ) -> str:
     """Set up or activate a virtual environment for testing with required packages."""
+    global _venv_python
     try:
         workspace_path = Path(".agent_workspace")
         workspace_path.mkdir(exist_ok=True)
         
-        venv_path = workspace_path / "test_venv"
+        venv_path = _VENV_PATH
         
         # Check if virtual environment already exists
         if venv_path.exists():
             # Virtual environment exists, get its info
-            if sys.platform == "win32":
-                python_exe = venv_path / "Scripts" / "python.exe"
-                pip_exe = venv_path / "Scripts" / "pip.exe"
-            else:
-                python_exe = venv_path / "bin" / "python"
-                pip_exe = venv_path / "bin" / "pip"
+            python_exe, pip_exe = _venv_executables(venv_path)
             
             if python_exe.exists():
                 venv_info = {
                     "status": "existing",
                     "message": f"Using existing virtual environment at {venv_path}",
                     "venv_path": str(venv_path),
-                    "python_exe": str(python_exe),
-                    "pip_exe": str(pip_exe)
+                    "python_exe": str(python_exe)
                 }
             else:
                 # Corrupted venv, recreate
                 import shutil
                 shutil.rmtree(venv_path)
+                _has_pytest.clear()
                 return setup_test_environment(required_packages)
         else:
-            # Create new virtual environment
+            # Create new virtual environment; without pip, since ensurepip is the
+            # slowest part and only installs need pip
             result = subprocess.run(
-                [sys.executable, "-m", "venv", str(venv_path)],
+                [sys.executable, "-m", "venv", "--without-pip", str(venv_path)],
                 capture_output=True,
                 text=True,
                 timeout=60
             )
             
             if result.returncode != 0:
-                return json.dumps({
+                return dumps({
                     "status": "error",
                     "message": f"Failed to create virtual environment: {result.stderr}"
                 })
             
-            if sys.platform == "win32":
-                python_exe = venv_path / "Scripts" / "python.exe"
-                pip_exe = venv_path / "Scripts" / "pip.exe"
-            else:
-                python_exe = venv_path / "bin" / "python"
-                pip_exe = venv_path / "bin" / "pip"
+            python_exe, pip_exe = _venv_executables(venv_path)
+            _venv_python = str(python_exe)
+            # A fresh venv has no pytest, whatever was probed at this path before
+            _has_pytest.clear()
             
             venv_info = {
                 "status": "created",
                 "message": f"Created new virtual environment at {venv_path}",
                 "venv_path": str(venv_path),
-                "python_exe": str(python_exe),
-                "pip_exe": str(pip_exe)
+                "python_exe": str(python_exe)
             }
         
-        # Install required packages if specified
+        # Install required packages if specified: one pip run for all of them,
+        # paying pip's startup and dependency resolution once
         if required_packages:
-            for package in required_packages:
-                install_result = subprocess.run(
-                    [str(pip_exe), "install", package],
-                    capture_output=True,
-                    text=True,
-                    timeout=120
-                )
-                
-                if install_result.returncode != 0:
-                    venv_info["warning"] = f"Failed to install {package}: {install_result.stderr}"
-                    break
-            else:
+            pip_env = _pip_env(workspace_path)
+            pip_command = _pip_command(python_exe, pip_exe)
+            venv_info["pip_command"] = " ".join(pip_command)
+            venv_info["pip_cache_dir"] = pip_env["PIP_CACHE_DIR"]
+            install_result = subprocess.run(
+                [*pip_command, "install", "--prefer-binary", *required_packages],
+                capture_output=True,
+                text=True,
+                timeout=120 + 30 * len(required_packages),
+                env=pip_env
+            )
+            
+            # The installs may have added pytest to the venv
+            _has_pytest.clear()
+            if install_result.returncode == 0:
                 venv_info["packages_installed"] = required_packages
+            else:
+                # Retry one at a time to report which package broke
+                for package in required_packages:
+                    install_result = subprocess.run(
+                        [*pip_command, "install", "--prefer-binary", package],
+                        capture_output=True,
+                        text=True,
+                        timeout=120,
+                        env=pip_env
+                    )
+                    
+                    if install_result.returncode != 0:
+                        venv_info["warning"] = f"Failed to install {package}: {install_result.stderr}"
+                        break
+                else:
+                    venv_info["packages_installed"] = required_packages
         
-        return json.dumps(venv_info)
+        return dumps(venv_info)
         
     except subprocess.TimeoutExpired:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": "Virtual environment setup timed out"
         })
     except Exception as e:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": f"Error setting up test environment: {str(e)}"
         })
@@ -111,8 +237,8 @@ def write_unit_tests(
 ) -> str:
     """Write unit tests for a function."""
     try:
-        # Validate test code
-        compile(test_code, '<string>', 'exec')
+        # Validate test code (parse only; no bytecode is needed)
+        ast.parse(test_code)
         
         temp_storage_path = Path(".agent_workspace")
         test_file = temp_storage_path / f"test_{function_name}.py"
@@ -120,20 +246,20 @@ def write_unit_tests(
         with open(test_file, 'w', encoding='utf-8') as f:
             f.write(test_code)
         
-        return json.dumps({
+        return dumps({
             "status": "success",
             "message": f"Unit tests for '{function_name}' created successfully",
             "test_file": str(test_file),
             "function_file": function_file
         })
     except SyntaxError as e:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": f"Syntax error in test code: {str(e)}",
             "error_line": e.lineno
         })
     except Exception as e:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": f"Error creating unit tests: {str(e)}"
         })
@@ -150,42 +276,40 @@ def run_unit_tests(
         python_exe = sys.executable
         
         if use_venv:
-            workspace_path = Path(".agent_workspace")
-            venv_path = workspace_path / "test_venv"
-            
-            if venv_path.exists():
-                if sys.platform == "win32":
-                    venv_python = venv_path / "Scripts" / "python.exe"
-                else:
-                    venv_python = venv_path / "bin" / "python"
-                
-                if venv_python.exists():
-                    python_exe = str(venv_python)
+            python_exe = _resolve_venv_python() or python_exe
         
-        # Run pytest or unittest
+        # Run pytest, or unittest if pytest is not available
+        if _pytest_available(python_exe):
+            command = [python_exe, "-m", "pytest", test_file, "-v", "--tb=short"]
+        else:
+            command = [python_exe, "-m", "unittest", test_file]
         result = subprocess.run(
-            [python_exe, "-m", "pytest", test_file, "-v", "--tb=short"],
+            command,
             capture_output=True,
-            text=True,
             timeout=30
         )
-        
-        # If pytest is not available, fall back to unittest
-        if result.returncode == 1 and "No module named pytest" in result.stderr:
+        if (command[2] == "pytest" and result.returncode == 1
+                and b"No module named pytest" in result.stderr):
+            # Stale probe (e.g. the venv was rebuilt since): fall back to unittest
+            _has_pytest[python_exe] = False
             result = subprocess.run(
                 [python_exe, "-m", "unittest", test_file],
                 capture_output=True,
-                text=True,
                 timeout=30
             )
         
-        output = result.stdout + result.stderr
+        # Decode only what is returned; a verbose failing run can print megabytes.
+        # Each stream is capped on its own so a noisy stdout cannot hide stderr.
+        stdout, stdout_truncated = _clip_output(result.stdout)
+        stderr, stderr_truncated = _clip_output(result.stderr)
         
         test_result = {
             "test_file": test_file,
             "python_exe": python_exe,
-            "output": output
+            "output": stdout + stderr
         }
+        if stdout_truncated or stderr_truncated:
+            test_result["truncated"] = True
         
         if result.returncode == 0:
             test_result.update({
@@ -199,16 +323,16 @@ def run_unit_tests(
                 "needs_fix": True
             })
         
-        return json.dumps(test_result)
+        return dumps(test_result)
         
     except subprocess.TimeoutExpired:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": "Tests timed out after 30 seconds",
             "needs_fix": True
         })
     except Exception as e:
-        return json.dumps({
+        return dumps({
             "status": "error",
             "message": f"Error running tests: {str(e)}",
             "needs_fix": True